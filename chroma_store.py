@@ -0,0 +1,192 @@
+import os
+import sys
+import zlib
+import threading
+from collections import OrderedDict
+from dotenv import load_dotenv
+from langchain_chroma import Chroma
+from langchain_openai import OpenAIEmbeddings
+from settings import get_section
+from rate_limiter import http_client
+
+load_dotenv()
+
+# Vector store settings (config.yaml -> vector_store)
+#   layout: "per_activity" keeps one persist directory per activity (chroma_db/<activity>)
+#           "consolidated" keeps every activity in a sharded set of collections,
+#           partitioned by the "activity" metadata field
+_settings = get_section("vector_store")
+LAYOUT = os.getenv("VECTOR_STORE_LAYOUT", _settings.get("layout", "per_activity"))
+PERSIST_DIRECTORY = _settings.get("persist_directory", "chroma_db")
+CONSOLIDATED_DIRECTORY = os.path.join(PERSIST_DIRECTORY, _settings.get("consolidated_directory", "_consolidated"))
+SHARDS = int(_settings.get("shards", 1))
+MAX_OPEN_COLLECTIONS = int(_settings.get("max_open_collections", 16))
+#   backend: "chroma" (persistent Chroma client) or "flat" (memory-mapped NumPy index,
+#            one directory per activity under flat_directory)
+BACKEND = os.getenv("VECTOR_STORE_BACKEND", _settings.get("backend", "chroma"))
+FLAT_DIRECTORY = _settings.get("flat_directory", "flat_db")
+FLAT_QUANTIZATION = _settings.get("flat_quantization", "float16")
+ACTIVITY_FIELD = "activity"
+
+_embedding = None
+_consolidated_client = None
+_open_collections = OrderedDict()
+_lock = threading.Lock()
+
+
+def get_embedding():
+    global _embedding
+    if _embedding is None:
+        _embedding = OpenAIEmbeddings(openai_api_key=os.getenv("OPENAI_API_KEY"), http_client=http_client())
+    return _embedding
+
+
+def shard_name(activity: str) -> str:
+    """Stable shard (collection) name for an activity in the consolidated layout"""
+    return f"activities_{zlib.crc32(str(activity).encode()) % SHARDS}"
+
+
+class ActivityView:
+    """Filtered view over a consolidated collection, scoped to a single activity.
+
+    Exposes the same similarity_search / max_marginal_relevance_search / get
+    surface the crews use on a plain Chroma store.
+    """
+
+    def __init__(self, store: Chroma, activity: str):
+        self.store = store
+        self.activity = str(activity)
+
+    def _scoped(self, where=None):
+        clauses = [{ACTIVITY_FIELD: self.activity}]
+        if where:
+            if "$and" in where and len(where) == 1:
+                clauses.extend(where["$and"])
+            else:
+                clauses.extend({key: value} for key, value in where.items())
+        return clauses[0] if len(clauses) == 1 else {"$and": clauses}
+
+    def similarity_search(self, query, k=4, filter=None, **kwargs):
+        return self.store.similarity_search(query, k=k, filter=self._scoped(filter), **kwargs)
+
+    def similarity_search_with_score(self, query, k=4, filter=None, **kwargs):
+        return self.store.similarity_search_with_score(query, k=k, filter=self._scoped(filter), **kwargs)
+
+    def max_marginal_relevance_search(self, query, k=4, fetch_k=20, lambda_mult=0.5, filter=None, **kwargs):
+        return self.store.max_marginal_relevance_search(
+            query, k=k, fetch_k=fetch_k, lambda_mult=lambda_mult, filter=self._scoped(filter), **kwargs
+        )
+
+    def get(self, ids=None, where=None, **kwargs):
+        if ids is not None:
+            kwargs["ids"] = ids
+        return self.store.get(where=self._scoped(where), **kwargs)
+
+    def add_documents(self, documents, ids=None, **kwargs):
+        for doc in documents:
+            doc.metadata[ACTIVITY_FIELD] = self.activity
+        return self.store.add_documents(documents, ids=ids, **kwargs)
+
+    def delete(self, ids=None):
+        if ids is None:
+            ids = self.get(include=[])["ids"]
+        if ids:
+            self.store.delete(ids=ids)
+
+    def __getattr__(self, name):
+        return getattr(self.store, name)
+
+
+def _open(activity: str):
+    """Open an activity's store; returns (store, client), client being the chromadb client it owns, if any"""
+    import chromadb
+    if BACKEND == "flat":
+        from flat_index import FlatIndex
+        return FlatIndex(
+            os.path.join(FLAT_DIRECTORY, str(activity)),
+            embedding_function=get_embedding(),
+            quantize=FLAT_QUANTIZATION
+        ), None
+    if LAYOUT == "consolidated":
+        global _consolidated_client
+        if _consolidated_client is None:
+            _consolidated_client = chromadb.PersistentClient(path=CONSOLIDATED_DIRECTORY)
+        store = Chroma(
+            client=_consolidated_client,
+            collection_name=shard_name(activity),
+            embedding_function=get_embedding()
+        )
+        return ActivityView(store, activity), None
+    # chromadb caches one System (SQLite connection, HNSW files) per path until its last client closes
+    client = chromadb.PersistentClient(path=os.path.join(PERSIST_DIRECTORY, str(activity)))
+    return Chroma(client=client, embedding_function=get_embedding()), client
+
+
+def get_vector_store(activity: str):
+    """Return the vector store for an activity, reusing recently opened ones.
+
+    Evicting a per-activity store closes its chromadb client, so a store must
+    not be used after MAX_OPEN_COLLECTIONS other activities have been opened.
+    """
+    key = (BACKEND, LAYOUT, str(activity))
+    with _lock:
+        if key in _open_collections:
+            _open_collections.move_to_end(key)
+            return _open_collections[key][0]
+        store, client = _open(activity)
+        _open_collections[key] = (store, client)
+        while len(_open_collections) > MAX_OPEN_COLLECTIONS:
+            _, (_, evicted_client) = _open_collections.popitem(last=False)
+            if evicted_client is not None:
+                evicted_client.close()
+        return store
+
+
+def add_documents(activity: str, documents):
+    """Embed and store documents for an activity in the configured layout"""
+    store = get_vector_store(activity)
+    return store.add_documents(documents)
+
+
+def list_per_activity_stores(folder_path: str = PERSIST_DIRECTORY):
+    return sorted(
+        name for name in os.listdir(folder_path)
+        if os.path.isdir(os.path.join(folder_path, name)) and not name.startswith(("_", "."))
+    ) if os.path.isdir(folder_path) else []
+
+
+def migrate_per_activity_stores(folder_path: str = PERSIST_DIRECTORY, batch_size: int = 500):
+    """Copy every chroma_db/<activity> store into the consolidated layout.
+
+    Embeddings are copied as stored, so no documents are re-embedded. Ids are
+    prefixed with the activity so re-running the migration upserts in place.
+    """
+    import chromadb
+    client = chromadb.PersistentClient(path=CONSOLIDATED_DIRECTORY)
+    for activity in list_per_activity_stores(folder_path):
+        source_client = chromadb.PersistentClient(path=os.path.join(folder_path, activity))
+        try:
+            data = Chroma(client=source_client).get(include=["documents", "metadatas", "embeddings"])
+        finally:
+            source_client.close()
+        target = client.get_or_create_collection(shard_name(activity))
+        ids = data["ids"]
+        for start in range(0, len(ids), batch_size):
+            end = start + batch_size
+            metadatas = [dict(meta or {}, **{ACTIVITY_FIELD: activity}) for meta in data["metadatas"][start:end]]
+            target.upsert(
+                ids=[f"{activity}:{doc_id}" for doc_id in ids[start:end]],
+                embeddings=data["embeddings"][start:end],
+                documents=data["documents"][start:end],
+                metadatas=metadatas
+            )
+        print(f"Migrated {len(ids)} chunks for activity {activity} into {shard_name(activity)}")
+    client.close()
+    print(f"Migration complete. Consolidated store at: {CONSOLIDATED_DIRECTORY}")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "migrate":
+        migrate_per_activity_stores(*sys.argv[2:3])
+    else:
+        print("Usage: python chroma_store.py migrate [chroma_db]")
@@ -0,0 +1,121 @@
+from profiling import profiled
+
+
+@profiled("consolidated_extraction")
+def run_consolidated_extraction(collection_name, asset_type_names, strategy_values):
+    """Extract steps 1, 1.2 and 6 from one shared retrieval and a single structured LLM call.
+
+    Fields that fail validation fall back to the per-step crews. Returns
+    (step1_data, step1_2_data, step6_data) as plain dictionaries.
+    """
+    import os
+    import re
+    import json
+    from langchain_openai import ChatOpenAI
+    from pydantic import BaseModel, Field
+    from chroma_store import get_vector_store
+    from rate_limiter import http_client
+    from summaries import format_summaries
+    from step1_crew import run_crew_step1
+    from step1_2_crew import run_crew_security_strategy
+    from step6_crew import run_crew_step6, validate_returns
+
+    chroma_db = get_vector_store(collection_name)
+
+    class TimeSeriesRecord(BaseModel):
+        valuationDate: str = Field(..., pattern=r"\d{4}-\d{2}-\d{2}T00:00:00Z")
+        rorValue: float = Field(..., ge=-100.0, le=100.0)
+
+    class AnnualReturn(BaseModel):
+        year: int = Field(..., description="Calendar year of the YTD/annual figure")
+        ytdValue: float = Field(..., ge=-100.0, description="YTD/annual return as reported in the table")
+
+    class CombinedExtraction(BaseModel):
+        full_name: str = Field(..., description="Official full name of the fund")
+        abbreviation: str = Field(..., description="Short form abbreviation of the fund name")
+        date_of_inception: str = Field("not found", description="Fund inception date in YYYY-MM-DD format or 'not found'")
+        security_type: str = Field(..., description="Matched security type from predefined list or N/A")
+        strategy_value: str = Field(..., description="Matched strategy value from predefined list or N/A")
+        records: list[TimeSeriesRecord] = Field(default_factory=list, description="Monthly returns, one per month-end")
+        annual_returns: list[AnnualReturn] = Field(default_factory=list, description="YTD/annual figures reported in the table")
+
+    # Retrieve the context every step needs once, de-duplicated across queries
+    try:
+        chunks = []
+        all_metadata = chroma_db.get(include=["metadatas"])["metadatas"]
+        for source in sorted({meta['source'] for meta in all_metadata if meta}):
+            chunks.extend(chroma_db.get(where={"source": source}, limit=5, include=["documents"]).get("documents", []))
+        chunks.extend(doc.page_content for doc in chroma_db.similarity_search(
+            "inception date established founded effective date", k=5))
+        chunks.extend(doc.page_content for doc in chroma_db.max_marginal_relevance_search(
+            " ".join(["fund type", "investment vehicle", "security classification", *asset_type_names]),
+            k=5, fetch_k=20))
+        chunks.extend(doc.page_content for doc in chroma_db.max_marginal_relevance_search(
+            " ".join(["investment strategy", "portfolio allocation", *[f'"{value}"' for value in strategy_values]]),
+            k=5, fetch_k=20, lambda_mult=0.6))
+        # Whole tables are kept in one chunk at ingestion, so a few table chunks cover the returns
+        performance_query = "monthly returns performance table net of fees YTD"
+        performance_docs = chroma_db.similarity_search(performance_query, k=3, filter={"element_type": "Table"})
+        chunks.extend(doc.page_content for doc in performance_docs or chroma_db.similarity_search(performance_query, k=5))
+        context = "\n\n--- DOCUMENT CHUNK ---\n".join(dict.fromkeys(chunks))
+        digests = format_summaries(collection_name)
+        if digests:
+            context = f"{digests}\n\n{context}"
+    except Exception as e:
+        print(f"Consolidated retrieval failed, falling back to per-step crews: {e}")
+        context = None
+
+    llm = ChatOpenAI(
+        model=os.getenv("OPENAI_MODEL_NAME", "gpt-4o-mini"),
+        temperature=0,
+        openai_api_key=os.getenv("OPENAI_API_KEY"),
+        http_client=http_client()
+    ).with_structured_output(CombinedExtraction)
+
+    prompt = f"""You are a financial document analyst. Using only the document chunks below, extract:
+    1. full_name: the complete legal name of the fund (names are case-sensitive; never invent one)
+    2. abbreviation: the official short form of the fund name
+    3. date_of_inception: the fund inception date as YYYY-MM-DD, or 'not found'
+    4. security_type: the closest match from {asset_type_names}, or N/A
+    5. strategy_value: the closest match from {strategy_values}, or N/A
+    6. records: every monthly return from the performance tables, dated on the last day of the
+       month as YYYY-MM-DDT00:00:00Z, with rorValue in percent
+    7. annual_returns: the YTD/annual figure reported for each year, if the table has one
+
+    Document chunks:
+    {context}
+    """
+    extracted = {}
+    if context is not None:
+        try:
+            extracted = llm.invoke(prompt).model_dump()
+        except Exception as e:
+            print(f"Consolidated extraction failed, falling back to per-step crews: {e}")
+
+    # Validate each field group; failures are re-run through the per-step crews
+    step1_data = {key: extracted.get(key) for key in ("full_name", "abbreviation", "date_of_inception")}
+    step1_valid = (
+        all(step1_data.get(key) and step1_data[key].lower() != "not found" for key in ("full_name", "abbreviation"))
+        and bool(re.fullmatch(r"\d{4}-\d{2}-\d{2}|not found", step1_data.get("date_of_inception") or ""))
+    )
+    step1_2_data = {key: extracted.get(key) for key in ("security_type", "strategy_value")}
+    step1_2_valid = (
+        step1_2_data["security_type"] in [*asset_type_names, "N/A"]
+        and step1_2_data["strategy_value"] in [*strategy_values, "N/A"]
+    )
+    step6_data = {key: extracted.get(key) or [] for key in ("records", "annual_returns")}
+    annual_returns = {item["year"]: item["ytdValue"] for item in step6_data["annual_returns"]}
+    step6_issues = validate_returns(step6_data["records"], annual_returns)
+    step6_valid = bool(step6_data["records"]) and not step6_issues
+
+    if not step1_valid:
+        print(f"Consolidated step 1 fields failed validation: {json.dumps(step1_data)}")
+        step1_data = run_crew_step1(collection_name).to_dict()
+    if not step1_2_valid:
+        print(f"Consolidated step 1.2 fields failed validation: {json.dumps(step1_2_data)}")
+        step1_2_data = run_crew_security_strategy(collection_name, asset_type_names, strategy_values).to_dict()
+    if not step6_valid:
+        print(f"Consolidated returns failed validation: {step6_issues or 'no records'}")
+        step6_data = run_crew_step6(collection_name).to_dict()
+
+    return step1_data, step1_2_data, step6_data
@@ -0,0 +1,236 @@
+import os
+import json
+import uuid
+import numpy as np
+from langchain_core.documents import Document
+
+# Rows scored per matrix product, to bound memory on large indexes
+SEARCH_BATCH_ROWS = 8192
+
+
+class FlatIndex:
+    """Exact vector index over a memory-mapped NumPy array.
+
+    A lightweight alternative to a Chroma persistent client for small
+    per-activity collections, exposing the same similarity_search /
+    max_marginal_relevance_search / get(where=...) surface the crews use.
+
+    Embeddings are L2-normalised and stored as float16, or as int8 with a
+    per-row scale when quantize="int8". Documents, metadata and ids are kept
+    in a JSON-lines sidecar in the same row order.
+    """
+
+    def __init__(self, directory: str, embedding_function=None, quantize: str = "float16"):
+        self.directory = directory
+        self.embedding_function = embedding_function
+        self.quantize = quantize
+        self.ids, self.documents, self.metadatas = [], [], []
+        self._vectors = None
+        self._scales = None
+        self._load()
+
+    # ------------------------------------------------------------------ storage
+    @property
+    def _vectors_path(self):
+        return os.path.join(self.directory, "embeddings.npy")
+
+    @property
+    def _scales_path(self):
+        return os.path.join(self.directory, "scales.npy")
+
+    @property
+    def _sidecar_path(self):
+        return os.path.join(self.directory, "metadata.jsonl")
+
+    def _load(self):
+        if not os.path.exists(self._vectors_path):
+            return
+        self._load_vectors_only()
+        with open(self._sidecar_path, "r") as sidecar:
+            for line in sidecar:
+                row = json.loads(line)
+                self.ids.append(row["id"])
+                self.documents.append(row["document"])
+                self.metadatas.append(row["metadata"])
+
+    def _write(self, vectors, ids, documents, metadatas):
+        """Atomically replace the stored arrays and sidecar"""
+        os.makedirs(self.directory, exist_ok=True)
+        self._vectors = self._scales = None
+        if self.quantize == "int8":
+            scales = np.maximum(np.abs(vectors).max(axis=1), 1e-12) / 127.0 if len(vectors) else np.zeros(0, np.float32)
+            stored = np.round(vectors / scales[:, None]).astype(np.int8) if len(vectors) else vectors.astype(np.int8)
+            np.save(self._scales_path + ".tmp.npy", scales.astype(np.float32))
+            os.replace(self._scales_path + ".tmp.npy", self._scales_path)
+        else:
+            stored = vectors.astype(np.float16)
+        np.save(self._vectors_path + ".tmp.npy", stored)
+        os.replace(self._vectors_path + ".tmp.npy", self._vectors_path)
+        with open(self._sidecar_path + ".tmp", "w") as sidecar:
+            for row in zip(ids, documents, metadatas):
+                sidecar.write(json.dumps({"id": row[0], "document": row[1], "metadata": row[2]}) + "\n")
+        os.replace(self._sidecar_path + ".tmp", self._sidecar_path)
+        self.ids, self.documents, self.metadatas = list(ids), list(documents), list(metadatas)
+        self._load_vectors_only()
+
+    def _load_vectors_only(self):
+        self._vectors = np.load(self._vectors_path, mmap_mode="r")
+        self._scales = np.load(self._scales_path, mmap_mode="r") if self._vectors.dtype == np.int8 else None
+
+    def _rows(self, start=0, stop=None):
+        """Dequantised float32 rows [start, stop)"""
+        rows = np.asarray(self._vectors[start:stop], dtype=np.float32)
+        if self._scales is not None:
+            rows *= np.asarray(self._scales[start:stop], dtype=np.float32)[:, None]
+        return rows
+
+    def _all_rows(self):
+        if self._vectors is None:
+            return np.zeros((0, 0), dtype=np.float32)
+        return self._rows()
+
+    @staticmethod
+    def _normalise(vectors):
+        vectors = np.asarray(vectors, dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+        return vectors / np.maximum(norms, 1e-12)
+
+    # ------------------------------------------------------------------ writes
+    def add_documents(self, documents, ids=None, **kwargs):
+        texts = [doc.page_content for doc in documents]
+        metadatas = [dict(doc.metadata) for doc in documents]
+        return self.add_texts(texts, metadatas=metadatas, ids=ids)
+
+    def add_texts(self, texts, metadatas=None, ids=None, embeddings=None, **kwargs):
+        texts = list(texts)
+        if not texts:
+            return []
+        ids = list(ids) if ids else [str(uuid.uuid4()) for _ in texts]
+        metadatas = list(metadatas) if metadatas else [{} for _ in texts]
+        if embeddings is None:
+            embeddings = self.embedding_function.embed_documents(texts)
+        new_vectors = self._normalise(embeddings)
+        existing = self._all_rows()
+        vectors = np.vstack([existing, new_vectors]) if existing.size else new_vectors
+        self._write(vectors, self.ids + ids, self.documents + texts, self.metadatas + metadatas)
+        return ids
+
+    def delete(self, ids=None):
+        if ids is None or not self.ids:
+            return
+        drop = set(ids)
+        keep = np.array([doc_id not in drop for doc_id in self.ids], dtype=bool)
+        if keep.all():
+            return
+        self._write(
+            self._all_rows()[keep],
+            [value for value, kept in zip(self.ids, keep) if kept],
+            [value for value, kept in zip(self.documents, keep) if kept],
+            [value for value, kept in zip(self.metadatas, keep) if kept]
+        )
+
+    # ------------------------------------------------------------------ filters
+    @staticmethod
+    def _matches(metadata, where):
+        for key, condition in where.items():
+            if key == "$and":
+                if not all(FlatIndex._matches(metadata, clause) for clause in condition):
+                    return False
+            elif key == "$or":
+                if not any(FlatIndex._matches(metadata, clause) for clause in condition):
+                    return False
+            elif isinstance(condition, dict):
+                value = metadata.get(key)
+                for operator, operand in condition.items():
+                    if operator == "$eq" and value != operand:
+                        return False
+                    if operator == "$ne" and value == operand:
+                        return False
+                    if operator == "$in" and value not in operand:
+                        return False
+                    if operator == "$nin" and value in operand:
+                        return False
+                    if operator in ("$gt", "$gte", "$lt", "$lte"):
+                        if value is None:
+                            return False
+                        if operator == "$gt" and not value > operand:
+                            return False
+                        if operator == "$gte" and not value >= operand:
+                            return False
+                        if operator == "$lt" and not value < operand:
+                            return False
+                        if operator == "$lte" and not value <= operand:
+                            return False
+            elif metadata.get(key) != condition:
+                return False
+        return True
+
+    def _mask(self, where=None):
+        if not where:
+            return np.ones(len(self.ids), dtype=bool)
+        return np.array([self._matches(meta or {}, where) for meta in self.metadatas], dtype=bool)
+
+    # ------------------------------------------------------------------ reads
+    def _scores(self, query_vector, mask):
+        """Cosine similarity of the query against every row, -inf where masked out"""
+        scores = np.full(len(self.ids), -np.inf, dtype=np.float32)
+        for start in range(0, len(self.ids), SEARCH_BATCH_ROWS):
+            stop = start + SEARCH_BATCH_ROWS
+            if mask[start:stop].any():
+                scores[start:stop] = self._rows(start, stop) @ query_vector
+        scores[~mask] = -np.inf
+        return scores
+
+    def _top(self, query, k, filter):
+        if not self.ids:
+            return np.zeros(0, dtype=int), None, None
+        mask = self._mask(filter)
+        k = min(k, int(mask.sum()))
+        if k <= 0:
+            return np.zeros(0, dtype=int), None, None
+        query_vector = self._normalise(self.embedding_function.embed_query(query))
+        scores = self._scores(query_vector, mask)
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return top, scores, query_vector
+
+    def _document(self, index):
+        return Document(page_content=self.documents[index], metadata=dict(self.metadatas[index] or {}))
+
+    def similarity_search(self, query, k=4, filter=None, **kwargs):
+        top, _, _ = self._top(query, k, filter)
+        return [self._document(index) for index in top]
+
+    def similarity_search_with_score(self, query, k=4, filter=None, **kwargs):
+        """Returns (Document, cosine distance) pairs, lower is closer"""
+        top, scores, _ = self._top(query, k, filter)
+        return [(self._document(index), float(1.0 - scores[index])) for index in top]
+
+    def max_marginal_relevance_search(self, query, k=4, fetch_k=20, lambda_mult=0.5, filter=None, **kwargs):
+        candidates, scores, _ = self._top(query, fetch_k, filter)
+        if not len(candidates):
+            return []
+        vectors = self._normalise(np.stack([self._rows(index, index + 1)[0] for index in candidates]))
+        relevance = scores[candidates]
+        selected = [0]
+        while len(selected) < min(k, len(candidates)):
+            redundancy = (vectors @ vectors[selected].T).max(axis=1)
+            mmr = lambda_mult * relevance - (1 - lambda_mult) * redundancy
+            mmr[selected] = -np.inf
+            selected.append(int(np.argmax(mmr)))
+        return [self._document(candidates[index]) for index in selected]
+
+    def get(self, ids=None, where=None, limit=None, offset=None, include=("documents", "metadatas"), **kwargs):
+        mask = self._mask(where)
+        if ids is not None:
+            wanted = set([ids] if isinstance(ids, str) else ids)
+            mask &= np.array([doc_id in wanted for doc_id in self.ids], dtype=bool)
+        rows = np.flatnonzero(mask)[offset or 0:]
+        if limit is not None:
+            rows = rows[:limit]
+        return {
+            "ids": [self.ids[index] for index in rows],
+            "documents": [self.documents[index] for index in rows] if "documents" in include else None,
+            "metadatas": [self.metadatas[index] for index in rows] if "metadatas" in include else None,
+            "embeddings": self._all_rows()[rows] if "embeddings" in include and len(rows) else None,
+        }
@@ -0,0 +1,285 @@
+import os
+import json
+import shutil
+import struct
+import sqlite3
+import argparse
+import tempfile
+from datetime import datetime
+from settings import get_section
+import chroma_store
+import summaries
+
+# Housekeeping settings (config.yaml -> housekeeping)
+_settings = get_section("housekeeping")
+LEDGER_PATH = _settings.get("ledger_path", "activity_ledger.json")
+ARCHIVE_DIRECTORY = _settings.get("archive_directory", "archive")
+DOCUMENT_ROOTS = _settings.get("document_roots", ["data"])
+REQUIRED_STEPS = _settings.get("required_steps", ["Name Value Pair Insert", "Asset Creation", "Returns Creation"])
+
+# Temporary collection names used while a collection is rebuilt
+REBUILD_SUFFIX = "-rebuild"
+RETIRED_SUFFIX = "-retired"
+
+
+def _size(path):
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+    return sum(
+        os.path.getsize(os.path.join(root, name))
+        for root, _, files in os.walk(path) for name in files
+    )
+
+
+def _format_size(size):
+    for unit in ("B", "KB", "MB", "GB"):
+        if size < 1024:
+            return f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} TB"
+
+
+# ---------------------------------------------------------------- activity ledger
+def load_ledger():
+    if not os.path.exists(LEDGER_PATH):
+        return {}
+    with open(LEDGER_PATH, "r") as ledger:
+        return json.load(ledger)
+
+
+def mark_steps_complete(activity_id, step_names):
+    """Record steps whose InsertStepResult write succeeded for an activity"""
+    ledger = load_ledger()
+    entry = ledger.setdefault(str(activity_id), {"completed_steps": []})
+    entry["completed_steps"] = sorted(set(entry["completed_steps"]) | set(step_names))
+    entry["updated"] = datetime.now().isoformat(timespec="seconds")
+    with open(LEDGER_PATH + ".tmp", "w") as ledger_file:
+        json.dump(ledger, ledger_file, indent=2)
+    os.replace(LEDGER_PATH + ".tmp", LEDGER_PATH)
+
+
+def record_step_results(outcomes, step_names):
+    """Mark steps complete from InsertStepResult write outcomes.
+
+    A step counts only when its result was written and reports processResult
+    true, so a failed step keeps its activity out of retention.
+    """
+    for outcome in outcomes:
+        record = outcome["record"]
+        if outcome["ok"] and record["processResult"] and record["stepId"] in step_names:
+            mark_steps_complete(record["activityId"], [step_names[record["stepId"]]])
+
+
+def completed_activities():
+    return sorted(
+        activity for activity, entry in load_ledger().items()
+        if set(REQUIRED_STEPS) <= set(entry.get("completed_steps", []))
+    )
+
+
+# ---------------------------------------------------------------- compaction
+def _duplicate_ids(data, key_fields=("source",)):
+    """Ids of chunks that repeat an earlier chunk's text from the same source"""
+    seen, duplicates = set(), []
+    for doc_id, document, metadata in zip(data["ids"], data["documents"], data["metadatas"]):
+        metadata = metadata or {}
+        key = (document, *(metadata.get(field) for field in key_fields))
+        if key in seen:
+            duplicates.append(doc_id)
+        else:
+            seen.add(key)
+    return duplicates
+
+
+def _vacuum(sqlite_path, dry_run):
+    if os.path.exists(sqlite_path) and not dry_run:
+        connection = sqlite3.connect(sqlite_path)
+        connection.execute("VACUUM")
+        connection.close()
+
+
+def _hnsw_element_count(path, collection):
+    """Elements in a collection's persisted HNSW index, deleted ones included, or None if not on disk"""
+    try:
+        connection = sqlite3.connect(os.path.join(path, "chroma.sqlite3"))
+        try:
+            segments = connection.execute(
+                "SELECT id FROM segments WHERE collection = ? AND scope = 'VECTOR'", (str(collection.id),)
+            ).fetchall()
+        finally:
+            connection.close()
+    except sqlite3.Error:
+        return None
+    for (segment_id,) in segments:
+        header = os.path.join(path, segment_id, "header.bin")
+        if os.path.exists(header):
+            # chroma-hnswlib header: persist version (int32), then offset_level0,
+            # max_elements and cur_element_count (size_t each)
+            with open(header, "rb") as header_file:
+                _, _, max_elements, element_count = struct.unpack("<iQQQ", header_file.read(28))
+            return element_count if element_count <= max_elements else None
+    return None
+
+
+def _restore_interrupted_rebuilds(client):
+    """Put back collections left renamed by a rebuild that stopped part-way"""
+    names = {collection if isinstance(collection, str) else collection.name for collection in client.list_collections()}
+    for name in names:
+        if name.endswith(REBUILD_SUFFIX):
+            client.delete_collection(name)
+        elif name.endswith(RETIRED_SUFFIX):
+            original = name[:-len(RETIRED_SUFFIX)]
+            if original in names:
+                client.delete_collection(name)
+            else:
+                client.get_collection(name).modify(name=original)
+                print(f"  restored collection {original} from an interrupted rebuild")
+
+
+def _rebuild_chroma_collection(client, collection, data, keep_ids):
+    """Recreate a collection from its kept rows so the HNSW index holds no deleted entries.
+
+    The kept rows are written to a temporary collection first and swapped in by
+    renaming, so a failure part-way never loses the original collection.
+    """
+    keep = [index for index, doc_id in enumerate(data["ids"]) if doc_id in keep_ids]
+    name, metadata = collection.name, collection.metadata
+    rebuilt = client.create_collection(name + REBUILD_SUFFIX, metadata=metadata)
+    try:
+        for start in range(0, len(keep), 500):
+            batch = keep[start:start + 500]
+            rebuilt.add(
+                ids=[data["ids"][index] for index in batch],
+                embeddings=[data["embeddings"][index] for index in batch],
+                documents=[data["documents"][index] for index in batch],
+                metadatas=[data["metadatas"][index] for index in batch]
+            )
+    except Exception:
+        client.delete_collection(name + REBUILD_SUFFIX)
+        raise
+    collection.modify(name=name + RETIRED_SUFFIX)
+    rebuilt.modify(name=name)
+    client.delete_collection(name + RETIRED_SUFFIX)
+
+
+def compact_chroma_directory(path, key_fields=("source",), dry_run=False):
+    """De-duplicate re-ingested chunks, rebuild collections whose index holds deleted entries and vacuum SQLite"""
+    import chromadb
+    client = chromadb.PersistentClient(path=path)
+    if not dry_run:
+        _restore_interrupted_rebuilds(client)
+    removed = 0
+    for collection in client.list_collections():
+        collection = client.get_collection(collection if isinstance(collection, str) else collection.name)
+        data = collection.get(include=["documents", "metadatas", "embeddings"])
+        duplicates = set(_duplicate_ids(data, key_fields))
+        index_elements = _hnsw_element_count(path, collection)
+        # Deleted entries stay in the HNSW index; rows still in the write buffer are not yet in it
+        stale_index = index_elements is not None and index_elements > len(data["ids"])
+        if stale_index:
+            print(f"  {collection.name}: index holds {index_elements} elements for {len(data['ids'])} rows")
+        if (duplicates or stale_index) and not dry_run:
+            _rebuild_chroma_collection(client, collection, data, set(data["ids"]) - duplicates)
+        removed += len(duplicates)
+    _vacuum(os.path.join(path, "chroma.sqlite3"), dry_run)
+    return removed
+
+
+def compact_flat_directory(path, dry_run=False):
+    from flat_index import FlatIndex
+    index = FlatIndex(path)
+    duplicates = _duplicate_ids({"ids": index.ids, "documents": index.documents, "metadatas": index.metadatas})
+    if duplicates and not dry_run:
+        index.delete(duplicates)
+    return len(duplicates)
+
+
+def compact_stores(dry_run=False):
+    print("Compacting live collections")
+    for activity in chroma_store.list_per_activity_stores(chroma_store.PERSIST_DIRECTORY):
+        removed = compact_chroma_directory(os.path.join(chroma_store.PERSIST_DIRECTORY, activity), dry_run=dry_run)
+        print(f"  chroma {activity}: {removed} duplicate chunks removed")
+    if os.path.isdir(chroma_store.CONSOLIDATED_DIRECTORY):
+        removed = compact_chroma_directory(
+            chroma_store.CONSOLIDATED_DIRECTORY, key_fields=(chroma_store.ACTIVITY_FIELD, "source"), dry_run=dry_run
+        )
+        print(f"  consolidated: {removed} duplicate chunks removed")
+    for activity in chroma_store.list_per_activity_stores(chroma_store.FLAT_DIRECTORY):
+        removed = compact_flat_directory(os.path.join(chroma_store.FLAT_DIRECTORY, activity), dry_run=dry_run)
+        print(f"  flat {activity}: {removed} duplicate chunks removed")
+
+
+# ---------------------------------------------------------------- retention
+def activity_paths(activity):
+    """Per-activity vector stores, summaries and downloaded document folders on disk"""
+    candidates = [
+        os.path.join(chroma_store.PERSIST_DIRECTORY, activity),
+        os.path.join(chroma_store.FLAT_DIRECTORY, activity),
+        os.path.join(summaries.CONSOLIDATED_SUMMARY_DIRECTORY, activity),
+        *[os.path.join(root, activity) for root in DOCUMENT_ROOTS]
+    ]
+    return [path for path in candidates if os.path.isdir(path)]
+
+
+def _consolidated_rows(activity):
+    if not os.path.isdir(chroma_store.CONSOLIDATED_DIRECTORY):
+        return None, None
+    import chromadb
+    client = chromadb.PersistentClient(path=chroma_store.CONSOLIDATED_DIRECTORY)
+    try:
+        collection = client.get_collection(chroma_store.shard_name(activity))
+    except Exception:
+        return None, None
+    return collection, collection.get(where={chroma_store.ACTIVITY_FIELD: activity}, include=["documents", "metadatas"])
+
+
+def retire_activity(activity, mode="archive", dry_run=False):
+    """Archive (zip) or delete every store and document folder for a completed activity"""
+    paths = activity_paths(activity)
+    collection, rows = _consolidated_rows(activity)
+    if not paths and not (rows and rows["ids"]):
+        return
+    print(f"  {'Archiving' if mode == 'archive' else 'Deleting'} activity {activity}: {', '.join(paths) or 'consolidated rows only'}")
+    if dry_run:
+        return
+    if mode == "archive":
+        os.makedirs(ARCHIVE_DIRECTORY, exist_ok=True)
+        with tempfile.TemporaryDirectory() as staging:
+            for path in paths:
+                shutil.copytree(path, os.path.join(staging, os.path.normpath(path).replace(os.sep, "__")))
+            if rows and rows["ids"]:
+                with open(os.path.join(staging, "consolidated.jsonl"), "w") as export:
+                    for row in zip(rows["ids"], rows["documents"], rows["metadatas"]):
+                        export.write(json.dumps({"id": row[0], "document": row[1], "metadata": row[2]}) + "\n")
+            shutil.make_archive(os.path.join(ARCHIVE_DIRECTORY, activity), "zip", staging)
+    for path in paths:
+        shutil.rmtree(path)
+    if rows and rows["ids"]:
+        collection.delete(ids=rows["ids"])
+
+
+def run(compact=True, retire=None, dry_run=False):
+    roots = [
+        chroma_store.PERSIST_DIRECTORY, chroma_store.FLAT_DIRECTORY,
+        *[os.path.join(root, activity) for root in DOCUMENT_ROOTS for activity in completed_activities()]
+    ]
+    before = sum(_size(path) for path in set(roots) if os.path.exists(path))
+    if compact:
+        compact_stores(dry_run=dry_run)
+    if retire:
+        print(f"Retiring completed activities ({retire})")
+        for activity in completed_activities():
+            retire_activity(activity, mode=retire, dry_run=dry_run)
+        if chroma_store.LAYOUT == "consolidated":
+            _vacuum(os.path.join(chroma_store.CONSOLIDATED_DIRECTORY, "chroma.sqlite3"), dry_run)
+    after = sum(_size(path) for path in set(roots) if os.path.exists(path))
+    print(f"Disk usage: {_format_size(before)} -> {_format_size(after)} (reclaimed {_format_size(before - after)})")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compact vector stores and retire completed activities")
+    parser.add_argument("--no-compact", action="store_true", help="skip de-duplication, index rebuild and vacuum")
+    parser.add_argument("--retire", choices=["archive", "delete"], help="archive or delete completed activities")
+    parser.add_argument("--dry-run", action="store_true", help="report what would change without modifying anything")
+    args = parser.parse_args()
+    run(compact=not args.no_compact, retire=args.retire, dry_run=args.dry_run)
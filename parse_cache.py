@@ -0,0 +1,134 @@
+import os
+import gzip
+import json
+import hashlib
+import tempfile
+import threading
+from langchain_core.documents import Document
+from settings import get_section
+
+# Parse cache settings (config.yaml -> parse_cache)
+_settings = get_section("parse_cache")
+ENABLED = os.getenv("PARSE_CACHE", str(_settings.get("enabled", True))).lower() in ("1", "true", "yes")
+CACHE_DIRECTORY = _settings.get("directory", "parse_cache")
+MAX_SIZE_MB = float(_settings.get("max_size_mb", 2048))
+
+# Metadata that describes where a file was found rather than what it contains
+LOCATION_METADATA = ("source", "file_directory", "filename")
+
+
+def file_hash(file_path, block_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as handle:
+        for block in iter(lambda: handle.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class ParseCache:
+    """Content-addressed cache of parsed elements, shared across activities.
+
+    Entries are keyed by the SHA-256 of the file bytes plus a parser version
+    string, stored as gzipped JSON, and evicted least-recently-used first
+    once the cache grows past max_bytes (hits refresh the entry's mtime).
+    The cache size is tracked as entries are written, so the directory is only
+    walked when the size check says an eviction is due. Failed writes are
+    reported and otherwise ignored.
+    """
+
+    def __init__(self, directory=CACHE_DIRECTORY, max_bytes=MAX_SIZE_MB * 1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._size = None
+        self._lock = threading.Lock()
+
+    def key(self, file_path, parser_version):
+        return self.key_from_hash(file_hash(file_path), parser_version)
+
+    @staticmethod
+    def key_from_hash(content_hash, parser_version):
+        return hashlib.sha256(f"{content_hash}:{parser_version}".encode()).hexdigest()
+
+    def contains(self, key):
+        return os.path.exists(self._path(key))
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], f"{key}.json.gz")
+
+    def get(self, key, file_path):
+        """Cached Documents for key, re-labelled with file_path's location, or None"""
+        path = self._path(key)
+        try:
+            with gzip.open(path, "rt") as entry:
+                rows = json.load(entry)
+        except (FileNotFoundError, OSError, ValueError):
+            return None
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            pass  # evicted by another writer since it was read; the rows are still valid
+        location = {
+            "source": file_path,
+            "file_directory": os.path.dirname(file_path),
+            "filename": os.path.basename(file_path)
+        }
+        return [Document(page_content=row["page_content"], metadata={**row["metadata"], **location}) for row in rows]
+
+    def put(self, key, documents):
+        path = self._path(key)
+        rows = [
+            {
+                "page_content": doc.page_content,
+                "metadata": {k: v for k, v in doc.metadata.items() if k not in LOCATION_METADATA}
+            }
+            for doc in documents
+        ]
+        tmp_path = None
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # A private temp file per writer, so concurrent puts of the same content cannot collide
+            handle, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+            with gzip.open(os.fdopen(handle, "wb"), "wt") as entry:
+                json.dump(rows, entry, default=str)
+            size = os.path.getsize(tmp_path)
+            with self._lock:
+                # Overwriting an entry replaces its bytes rather than adding to them
+                try:
+                    replaced = os.path.getsize(path)
+                except FileNotFoundError:
+                    replaced = 0
+                os.replace(tmp_path, path)
+                if self._size is None:
+                    self._size = self._scan()[1]
+                else:
+                    self._size += size - replaced
+                if self._size > self.max_bytes:
+                    self.evict()
+        except Exception as e:
+            print(f"Could not write parse cache entry {key}: {e}")
+            if tmp_path and os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def _scan(self):
+        entries = []
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if name.endswith(".json.gz"):
+                    try:
+                        stat = os.stat(os.path.join(root, name))
+                    except FileNotFoundError:
+                        continue
+                    entries.append((stat.st_mtime, stat.st_size, os.path.join(root, name)))
+        return entries, sum(size for _, size, _ in entries)
+
+    def evict(self):
+        entries, total = self._scan()
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+        self._size = total
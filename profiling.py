@@ -0,0 +1,132 @@
+import os
+import sys
+import time
+import random
+import pstats
+import cProfile
+import functools
+import itertools
+import threading
+import tracemalloc
+from contextlib import contextmanager
+from settings import get_section
+
+# Opt-in profiling: AES_PROFILE=1 or the --profile flag. AES_PROFILE_SAMPLE_RATE
+# profiles only that fraction of activities, so it can stay on in production.
+_settings = get_section("profiling")
+ENABLED = os.getenv("AES_PROFILE", str(_settings.get("enabled", False))).lower() in ("1", "true", "yes") \
+    or "--profile" in sys.argv
+PROFILE_DIRECTORY = os.getenv("AES_PROFILE_DIR", _settings.get("directory", "profiles"))
+SAMPLE_RATE = float(os.getenv("AES_PROFILE_SAMPLE_RATE", _settings.get("sample_rate", 1.0)))
+TOP_FUNCTIONS = 30
+TOP_ALLOCATIONS = 25
+
+_sampled = {}
+_counter = itertools.count(1)
+_local = threading.local()
+_tracing_lock = threading.Lock()
+_open_stages = 0
+_owns_tracing = False
+
+
+def is_sampled(activity_id) -> bool:
+    """Decide once per activity whether it is profiled"""
+    if not ENABLED:
+        return False
+    activity_id = str(activity_id)
+    if activity_id not in _sampled:
+        _sampled[activity_id] = random.random() < SAMPLE_RATE
+    return _sampled[activity_id]
+
+
+def _write_report(activity_id, name, profiler, elapsed, allocations):
+    directory = os.path.join(PROFILE_DIRECTORY, str(activity_id))
+    os.makedirs(directory, exist_ok=True)
+    base = os.path.join(directory, f"{next(_counter):03d}_{name}")
+    with open(base + ".txt", "w") as report:
+        report.write(f"Stage: {name}\nActivity: {activity_id}\nWall time: {elapsed:.3f}s\n\n")
+        if profiler is not None:
+            profiler.dump_stats(base + ".prof")
+            report.write(f"Top {TOP_FUNCTIONS} functions by cumulative time\n")
+            stats = pstats.Stats(profiler, stream=report)
+            stats.sort_stats("cumulative").print_stats(TOP_FUNCTIONS)
+        else:
+            report.write("cProfile unavailable (another profiler was active)\n")
+        report.write(f"\nTop {TOP_ALLOCATIONS} allocation sites (net growth during stage)\n")
+        for stat in allocations[:TOP_ALLOCATIONS]:
+            report.write(f"{stat}\n")
+    print(f"Profiled {name} for activity {activity_id} in {elapsed:.2f}s -> {base}.txt")
+
+
+def _start_tracing():
+    """Count an open stage; tracemalloc is process-wide, so the first stage starts it"""
+    global _open_stages, _owns_tracing
+    with _tracing_lock:
+        if _open_stages == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            _owns_tracing = True
+        _open_stages += 1
+
+
+def _stop_tracing():
+    """Stop tracemalloc when the last open stage, on any thread, has finished"""
+    global _open_stages, _owns_tracing
+    with _tracing_lock:
+        _open_stages -= 1
+        if _open_stages == 0 and _owns_tracing:
+            tracemalloc.stop()
+            _owns_tracing = False
+
+
+def _snapshot():
+    try:
+        return tracemalloc.take_snapshot()
+    except RuntimeError:
+        return None
+
+
+@contextmanager
+def stage(name, activity_id):
+    """Profile a pipeline stage with cProfile and tracemalloc when enabled for the activity.
+
+    Nested stages on the same thread are covered by the outermost one. Stages
+    may run concurrently on different threads; allocation reports then include
+    the other stages' allocations. Profiling failures never reach the profiled code.
+    """
+    if not is_sampled(activity_id) or getattr(_local, "active", False):
+        yield
+        return
+    _local.active = True
+    _start_tracing()
+    before = _snapshot()
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError:
+        profiler = None
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        if profiler is not None:
+            profiler.disable()
+        after = _snapshot()
+        _stop_tracing()
+        _local.active = False
+        try:
+            allocations = after.compare_to(before, "lineno") if before and after else []
+            _write_report(activity_id, name, profiler, elapsed, allocations)
+        except Exception as e:
+            print(f"Could not write profile for {name} (activity {activity_id}): {e}")
+
+
+def profiled(name):
+    """Decorator form of stage(); the activity id is the function's first argument"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(activity_id, *args, **kwargs):
+            with stage(name, activity_id):
+                return func(activity_id, *args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,249 @@
+import os
+import re
+import json
+import time
+import asyncio
+import threading
+from collections import deque
+import httpx
+from settings import get_section
+
+# Completion budget assumed for chat requests that do not set max_tokens
+DEFAULT_COMPLETION_TOKENS = 1000
+
+
+def _parse_duration(value):
+    """Parse OpenAI reset/retry durations such as '1s', '250ms', '6m0s' or '2' into seconds"""
+    if value is None:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    seconds = 0.0
+    for amount, unit in re.findall(r"([\d.]+)(ms|s|m|h)", value):
+        seconds += float(amount) * {"ms": 0.001, "s": 1, "m": 60, "h": 3600}[unit]
+    return seconds
+
+
+class RateLimiter:
+    """Process-wide limiter for request and token budgets with adaptive concurrency.
+
+    Callers are admitted in FIFO order once a request slot, enough token
+    budget and a concurrency slot are available. The concurrency limit is
+    halved on every 429 and grows back additively on successes; remaining
+    budgets and reset times are taken from x-ratelimit-* response headers.
+    """
+
+    def __init__(self, requests_per_minute=500, tokens_per_minute=200000, max_concurrency=8):
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.max_concurrency = max_concurrency
+        self.concurrency_limit = float(max_concurrency)
+        self._requests = float(requests_per_minute)
+        self._tokens = float(tokens_per_minute)
+        self._refilled = time.monotonic()
+        self._paused_until = 0.0
+        self._in_flight = 0
+        self._queue = deque()
+        self._cond = threading.Condition()
+
+    def _refill(self, now):
+        elapsed = now - self._refilled
+        self._refilled = now
+        self._requests = min(self.requests_per_minute, self._requests + elapsed * self.requests_per_minute / 60)
+        self._tokens = min(self.tokens_per_minute, self._tokens + elapsed * self.tokens_per_minute / 60)
+
+    def _wait_time(self, tokens, now):
+        """Seconds until the head of the queue could be admitted, 0 if it can go now"""
+        waits = [self._paused_until - now]
+        if self._requests < 1:
+            waits.append((1 - self._requests) * 60 / self.requests_per_minute)
+        if self._tokens < tokens:
+            waits.append((tokens - self._tokens) * 60 / self.tokens_per_minute)
+        return max(waits)
+
+    def acquire(self, tokens=1):
+        tokens = min(tokens, self.tokens_per_minute)
+        ticket = object()
+        with self._cond:
+            self._queue.append(ticket)
+            try:
+                while True:
+                    now = time.monotonic()
+                    self._refill(now)
+                    if self._queue[0] is ticket and self._in_flight < max(1, int(self.concurrency_limit)):
+                        wait = self._wait_time(tokens, now)
+                        if wait <= 0:
+                            break
+                        self._cond.wait(wait)
+                    else:
+                        self._cond.wait()
+                self._requests -= 1
+                self._tokens -= tokens
+                self._in_flight += 1
+            finally:
+                self._queue.remove(ticket)
+                self._cond.notify_all()
+
+    def release(self, status_code=None, headers=None):
+        now = time.monotonic()
+        headers = headers or {}
+        with self._cond:
+            self._in_flight -= 1
+            self._refill(now)
+            if status_code == 429:
+                self.concurrency_limit = max(1.0, self.concurrency_limit / 2)
+                if headers.get("retry-after-ms"):
+                    retry_after = float(headers["retry-after-ms"]) / 1000
+                else:
+                    retry_after = (
+                        _parse_duration(headers.get("retry-after"))
+                        or _parse_duration(headers.get("x-ratelimit-reset-tokens"))
+                        or _parse_duration(headers.get("x-ratelimit-reset-requests"))
+                        or 1.0
+                    )
+                self._paused_until = max(self._paused_until, now + retry_after)
+            elif status_code is not None and status_code < 500:
+                self.concurrency_limit = min(self.max_concurrency, self.concurrency_limit + 1 / self.concurrency_limit)
+            # Trust the server's view of the remaining budget when it is tighter than ours
+            remaining_requests = headers.get("x-ratelimit-remaining-requests")
+            remaining_tokens = headers.get("x-ratelimit-remaining-tokens")
+            if remaining_requests is not None:
+                self._requests = min(self._requests, float(remaining_requests))
+            if remaining_tokens is not None:
+                self._tokens = min(self._tokens, float(remaining_tokens))
+            self._cond.notify_all()
+
+
+def estimate_tokens(request: httpx.Request) -> int:
+    """Rough token estimate for an OpenAI request body (about 4 characters per token)"""
+    try:
+        body = json.loads(request.content or b"{}")
+    except ValueError:
+        return max(1, len(request.content or b"") // 4)
+    prompt = body.get("input", body.get("messages", body.get("prompt", "")))
+    completion = body.get("max_tokens") or body.get("max_completion_tokens")
+    if completion is None and "messages" in body:
+        completion = DEFAULT_COMPLETION_TOKENS
+    return max(1, len(json.dumps(prompt)) // 4 + (completion or 0))
+
+
+class RateLimitedTransport(httpx.BaseTransport):
+    """httpx transport that routes every request through a RateLimiter and retries 429s"""
+
+    def __init__(self, limiter: RateLimiter, transport: httpx.BaseTransport = None, max_retries: int = 5):
+        self.limiter = limiter
+        self.transport = transport or httpx.HTTPTransport()
+        self.max_retries = max_retries
+
+    def handle_request(self, request):
+        tokens = estimate_tokens(request)
+        for attempt in range(self.max_retries + 1):
+            self.limiter.acquire(tokens)
+            response = None
+            try:
+                response = self.transport.handle_request(request)
+            finally:
+                self.limiter.release(
+                    response.status_code if response is not None else None,
+                    response.headers if response is not None else None
+                )
+            if response.status_code != 429 or attempt == self.max_retries:
+                return response
+            response.read()
+            response.close()
+            print(f"Rate limited by {request.url.host}, retrying ({attempt + 1}/{self.max_retries})")
+        return response
+
+    def close(self):
+        self.transport.close()
+
+
+class AsyncRateLimitedTransport(httpx.AsyncBaseTransport):
+    """Async counterpart of RateLimitedTransport; waits for the limiter off the event loop"""
+
+    def __init__(self, limiter: RateLimiter, transport: httpx.AsyncBaseTransport = None, max_retries: int = 5):
+        self.limiter = limiter
+        self.transport = transport or httpx.AsyncHTTPTransport()
+        self.max_retries = max_retries
+
+    async def handle_async_request(self, request):
+        tokens = estimate_tokens(request)
+        for attempt in range(self.max_retries + 1):
+            await asyncio.to_thread(self.limiter.acquire, tokens)
+            response = None
+            try:
+                response = await self.transport.handle_async_request(request)
+            finally:
+                self.limiter.release(
+                    response.status_code if response is not None else None,
+                    response.headers if response is not None else None
+                )
+            if response.status_code != 429 or attempt == self.max_retries:
+                return response
+            await response.aread()
+            await response.aclose()
+            print(f"Rate limited by {request.url.host}, retrying ({attempt + 1}/{self.max_retries})")
+        return response
+
+    async def aclose(self):
+        await self.transport.aclose()
+
+
+_limiter = None
+_http_client = None
+_lock = threading.Lock()
+
+
+def get_limiter() -> RateLimiter:
+    """Shared limiter configured from config.yaml -> rate_limits (env vars override)"""
+    global _limiter
+    with _lock:
+        if _limiter is None:
+            settings = get_section("rate_limits")
+            _limiter = RateLimiter(
+                requests_per_minute=int(os.getenv("OPENAI_RPM", settings.get("requests_per_minute", 500))),
+                tokens_per_minute=int(os.getenv("OPENAI_TPM", settings.get("tokens_per_minute", 200000))),
+                max_concurrency=int(os.getenv("OPENAI_MAX_CONCURRENCY", settings.get("max_concurrency", 8)))
+            )
+        return _limiter
+
+
+def http_client() -> httpx.Client:
+    """Shared httpx client for OpenAI SDK clients (OpenAIEmbeddings, ChatOpenAI).
+
+    tests/test_rate_limiter.py exercises the transport against an in-process fake
+    endpoint; point OPENAI_BASE_URL at a local fake to try it end to end.
+    """
+    global _http_client
+    limiter = get_limiter()
+    with _lock:
+        if _http_client is None:
+            _http_client = httpx.Client(transport=RateLimitedTransport(limiter), timeout=httpx.Timeout(600.0))
+        return _http_client
+
+
+def async_http_client() -> httpx.AsyncClient:
+    """Async httpx client sharing the same limiter; a new client per caller, since
+    async clients are bound to the event loop they are used on"""
+    return httpx.AsyncClient(transport=AsyncRateLimitedTransport(get_limiter()), timeout=httpx.Timeout(600.0))
+
+
+def crew_llm(model=None, **kwargs):
+    """crewAI LLM for agents whose sync and async OpenAI clients go through the shared limiter.
+
+    crewAI builds both clients from the same client_params, so a single
+    http_client cannot be passed in; the clients are replaced after construction.
+    """
+    from crewai import LLM
+    from crewai.llms.providers.openai.completion import OpenAICompletion
+    from openai import OpenAI, AsyncOpenAI
+    llm = LLM(model=model or os.getenv("OPENAI_MODEL_NAME", "gpt-4o-mini"), **kwargs)
+    if not isinstance(llm, OpenAICompletion):
+        print(f"Rate limits only apply to OpenAI models; {llm.model} is not limited")
+        return llm
+    client_params = llm._get_client_params()
+    llm._client = OpenAI(**client_params, http_client=http_client())
+    llm._async_client = AsyncOpenAI(**client_params, http_client=async_http_client())
+    return llm
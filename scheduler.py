@@ -0,0 +1,136 @@
+import io
+import time
+import hashlib
+import itertools
+import threading
+from collections import defaultdict
+from concurrent.futures import Future
+
+# Rough seconds of work per unit, used only to rank jobs against each other
+TEXT_PAGE_COST = 0.2
+OCR_PAGE_COST = 3.0
+CACHED_PAGE_COST = 0.05
+COST_PER_MB = 1.0
+SPREADSHEET_COST_PER_MB = 2.0
+
+
+def estimate_cost(content: bytes, file_name: str) -> float:
+    """Estimate the ingestion cost of a downloaded document from its size, pages, type and cache state"""
+    from vector_store import file_parse_cache, parser_version
+    size_mb = len(content) / (1024 * 1024)
+    name = file_name.lower()
+    cached = file_parse_cache.contains(
+        file_parse_cache.key_from_hash(hashlib.sha256(content).hexdigest(), parser_version())
+    )
+    if name.endswith(".pdf"):
+        try:
+            from pypdf import PdfReader
+            reader = PdfReader(io.BytesIO(content))
+            pages = len(reader.pages)
+            has_text = bool((reader.pages[0].extract_text() or "").strip()) if pages else True
+        except Exception:
+            return size_mb * COST_PER_MB
+        if cached:
+            return pages * CACHED_PAGE_COST
+        return pages * (TEXT_PAGE_COST if has_text else OCR_PAGE_COST)
+    if cached:
+        return size_mb * CACHED_PAGE_COST
+    if name.endswith((".xlsx", ".xls")):
+        return size_mb * SPREADSHEET_COST_PER_MB
+    return size_mb * COST_PER_MB
+
+
+class Scheduler:
+    """Worker pool that runs queued jobs in cost-aware priority order.
+
+    Jobs belong to an activity (and a client); an activity's cost is the sum
+    of the estimated costs of its jobs that have not finished yet. Policies:
+      fifo  - submission order
+      sjf   - cheapest activity first
+      aged  - cheapest activity first, with each second of waiting worth
+              age_weight cost units, so large activities are not starved
+    max_running_per_client caps concurrent jobs per client (0 = no cap).
+    submit() returns a concurrent.futures.Future.
+    """
+
+    def __init__(self, workers=1, policy="aged", age_weight=1.0, max_running_per_client=0):
+        if policy not in ("fifo", "sjf", "aged"):
+            raise ValueError(f"Unknown scheduling policy: {policy}")
+        self.policy = policy
+        self.age_weight = age_weight
+        self.max_running_per_client = max_running_per_client
+        self._pending = []
+        self._activity_cost = defaultdict(float)
+        self._running_per_client = defaultdict(int)
+        self._sequence = itertools.count()
+        self._cond = threading.Condition()
+        self._shutdown = False
+        self._workers = [threading.Thread(target=self._work, daemon=True) for _ in range(workers)]
+        for worker in self._workers:
+            worker.start()
+
+    def submit(self, fn, *args, cost=1.0, activity_id=None, client_id=None, **kwargs):
+        future = Future()
+        job = {
+            "fn": fn, "args": args, "kwargs": kwargs, "future": future, "cost": cost,
+            "activity_id": activity_id, "client_id": client_id if client_id is not None else activity_id,
+            "sequence": next(self._sequence), "submitted": time.monotonic()
+        }
+        with self._cond:
+            self._activity_cost[activity_id] += cost
+            self._pending.append(job)
+            self._cond.notify()
+        return future
+
+    def _priority(self, job, now):
+        if self.policy == "fifo":
+            return (job["sequence"],)
+        cost = self._activity_cost[job["activity_id"]]
+        if self.policy == "aged":
+            cost -= self.age_weight * (now - job["submitted"])
+        return (cost, job["sequence"])
+
+    def _next_job(self):
+        now = time.monotonic()
+        eligible = [
+            job for job in self._pending
+            if not self.max_running_per_client
+            or self._running_per_client[job["client_id"]] < self.max_running_per_client
+        ]
+        if not eligible:
+            return None
+        job = min(eligible, key=lambda candidate: self._priority(candidate, now))
+        self._pending.remove(job)
+        return job
+
+    def _work(self):
+        while True:
+            with self._cond:
+                job = self._next_job()
+                while job is None:
+                    if self._shutdown and not self._pending:
+                        return
+                    self._cond.wait()
+                    job = self._next_job()
+                self._running_per_client[job["client_id"]] += 1
+            try:
+                if job["future"].set_running_or_notify_cancel():
+                    try:
+                        job["future"].set_result(job["fn"](*job["args"], **job["kwargs"]))
+                    except BaseException as e:
+                        job["future"].set_exception(e)
+            finally:
+                with self._cond:
+                    self._running_per_client[job["client_id"]] -= 1
+                    self._activity_cost[job["activity_id"]] -= job["cost"]
+                    if self._activity_cost[job["activity_id"]] <= 1e-9:
+                        del self._activity_cost[job["activity_id"]]
+                    self._cond.notify_all()
+
+    def shutdown(self, wait=True):
+        with self._cond:
+            self._shutdown = True
+            self._cond.notify_all()
+        if wait:
+            for worker in self._workers:
+                worker.join()
@@ -5,13 +5,20 @@ import yaml
 import requests
 import json
 import re
+import base64
 # from step6_crew import call_function_crew
 from step6_crew import run_crew_step6
 from step1_crew import run_crew_step1
 from step1_2_crew import run_crew_security_strategy
+from consolidated_crew import run_consolidated_extraction
 # from datetime import datetime
 # from dateutil.relativedelta import relativedelta
 from automation.apis.process_documents import APIClient, PDFHandler
+from write_behind import WriteBehindBuffer
+from housekeeping import record_step_results
+from profiling import stage
+from vector_store import ingest_document
+from scheduler import Scheduler, estimate_cost
 # from automation.model.multivector import content_piepline
 # from sentence_transformers import SentenceTransformer
 # import subprocess  
@@ -42,260 +49,336 @@ GetAllSteps = config["apis"]["GetAllSteps"]
 InsertStepResult = config["apis"]["InsertStepResult"]
 dropdown_asset_types = config["apis"]["dropdown_asset_types"]
 dropdown_strategy = config["apis"]["dropdown_strategy"]
-
-# Initialize API client
-client = APIClient()
-
-print("Document Processing Pipeline")
-
-# Authenticate User
-token = client.authenticate(email=user_email)
-if not token:
-    print("Authentication failed. Please check credentials.")
-    exit(1)
-print("Authentication successful!")
-
-# Fetch unprocessed documents
-unprocessed_documents = client.get_document_id(unprocessed_docs_endpoint)
-for doc in unprocessed_documents:
+# "crews" runs the per-step crews; "consolidated" extracts all steps in one pass
+extraction_mode = os.getenv("EXTRACTION_MODE", config.get("extraction", {}).get("mode", "crews"))
+
+# The pipeline runs only as a script, so worker processes that import this module do not re-run it
+if __name__ == "__main__":
+    # Initialize API client
+    client = APIClient()
+
+    print("Document Processing Pipeline")
+
+    # Authenticate User
+    token = client.authenticate(email=user_email)
+    if not token:
+        print("Authentication failed. Please check credentials.")
+        exit(1)
+    print("Authentication successful!")
+
+    # Key-value and step-result writes are buffered and posted in batches
+    write_behind_config = config.get("write_behind", {})
+    key_value_writer = WriteBehindBuffer(
+        client, InsertDocKeyValues,
+        max_records=write_behind_config.get("max_records", 100),
+        max_delay=write_behind_config.get("max_delay_seconds", 5.0),
+        max_retries=write_behind_config.get("max_retries", 3),
+        retry_backoff=write_behind_config.get("retry_backoff_seconds", 1.0)
+    )
+    step_result_writer = WriteBehindBuffer(
+        client, InsertStepResult,
+        max_records=write_behind_config.get("max_records", 100),
+        max_delay=write_behind_config.get("max_delay_seconds", 5.0),
+        max_retries=write_behind_config.get("max_retries", 3),
+        retry_backoff=write_behind_config.get("retry_backoff_seconds", 1.0)
+    )
+
+    # Each downloaded document is parsed and embedded in the background while the next one downloads.
+    # Queued documents are picked by the estimated cost of their activity's remaining work, so small
+    # activities are not stuck behind large ones. Downloads themselves still run in API order (costs
+    # are only known once a document is downloaded), and extraction waits only for its own activity.
+    ingestion_config = config.get("ingestion", {})
+    ingestion_executor = Scheduler(
+        workers=ingestion_config.get("workers", 1),
+        policy=ingestion_config.get("policy", "aged"),
+        age_weight=ingestion_config.get("age_weight", 1.0),
+        max_running_per_client=ingestion_config.get("max_running_per_client", 0)
+    )
+    ingestion_jobs = {}  # document id -> (activity id, future)
+
+
+    def wait_for_ingestion(activity=None):
+        """Wait for queued ingestion jobs; only those of one activity when it is given"""
+        for document_id, (job_activity, job) in list(ingestion_jobs.items()):
+            if activity is not None and job_activity != str(activity):
+                continue
+            try:
+                job.result()
+            except Exception as e:
+                print(f"Error ingesting Document ID {document_id}: {e}")
+            del ingestion_jobs[document_id]
+
+
+    # Fetch unprocessed documents
+    unprocessed_documents = client.get_document_id(unprocessed_docs_endpoint)
+    for doc in unprocessed_documents:
+        try:
+            document_id = doc.get("DocumentId")
+            if not document_id:
+                print("Skipping entry due to missing DocumentId")
+                continue
+
+            with stage("download", doc.get("ActivityId")):
+                response = client.make_request(f"{get_document}/{document_id}")
+            document_response = response
+            output_path = doc.get("ActivityId")
+            document_name = document_response.get("DocumentName")
+            document_content = document_response.get("DocumentContent")
+
+            if output_path and document_content and document_name:
+                content = base64.b64decode(document_content)
+                cost = estimate_cost(content, document_name)
+                ingestion_jobs[document_id] = (str(output_path), ingestion_executor.submit(
+                    ingest_document, output_path,
+                    content=content, file_name=document_name,
+                    cost=cost, activity_id=output_path, client_id=doc.get("ClientId")
+                ))
+                print(f"Queued document for ingestion: {output_path}/{document_name} (estimated cost {cost:.1f})")
+            else:
+                print(f"Warning: Missing DocumentName or DocumentContent for ID {document_id}")
+
+        except requests.exceptions.RequestException as e:
+            print(f"Request error while processing document {document_id}: {e}")
+        except KeyError as e:
+            print(f"Missing expected key in response for Document ID {document_id}: {e}")
+        except Exception as e:
+            print(f"Unexpected error processing Document ID {document_id}: {e}")
+
+    if not unprocessed_documents:
+        print("No unprocessed documents found.")
+    else:
+        print("Unprocessed Documents:", unprocessed_documents)
+
+    activity_id = "1863"
+    # Extraction starts once this activity's documents are ingested; other activities keep ingesting
+    wait_for_ingestion(activity_id)
+    print(f"Vector store updated for activity {activity_id}.")
+    # Preprocessing steps
+    # Update Processed For All - once file downloaded and stored in vector database
+    # try:
+    #     UpdateProcessedForAll_payload = [doc["ActivityId"] for doc in unprocessed_documents]
+    #     if UpdateProcessedForAll_payload:
+    #         GenAI/UpdateProcessedForDoc/{genAIDocumentId}
+    #         UpdateProcessedForAll_url = f"/GenAI/UpdateProcessedForAll/{UpdateProcessedForAll_payload}"
+    #         Update_Processed_ForAll = client.post_request(endpoint=UpdateProcessedForAll_url)
+    #         print("Update Processed For All:", Update_Processed_ForAll)
+    #     else:
+    #         print("No documents to update.")
+    # except Exception as e:
+    #     print(f"Error updating processed documents: {e}")
+
+    # Step 1 Starts: Dropdown API Calls
+    all_asset_types = client.get_request(dropdown_asset_types)
+    print("all_asset_types:", all_asset_types)
+    asset_type_names = [asset['AssetTypeName'] for asset in all_asset_types]
+    # print("asset_type_names:", asset_type_names)
+    all_strategy = client.get_request(dropdown_strategy)
+    print("all_strategy:", all_strategy)
+    strategy_values = [strategy['ClassificationValue'] for strategy in all_strategy]
+    # print("strategy_values:", strategy_values)
+
+    if extraction_mode == "consolidated":
+        data1, data2, step6_result = run_consolidated_extraction(activity_id, asset_type_names, strategy_values)
+    else:
+        step1_result = run_crew_step1(activity_id)
+        step1_2_result = run_crew_security_strategy(activity_id,asset_type_names,strategy_values)
+        data1 = step1_result.to_dict()
+        data2 = step1_2_result.to_dict()
+    print(f"step1_result: {data1}")
+    print(f"step1_2_result: {data2}")
+
+    def get_ids(data2, all_strategy, all_asset_types):
+        result = {
+            "security_type_id": None,
+            "strategy_value_id": None
+        }
+
+        # Loop to find security_type_id
+        for item in all_strategy:
+            if item["ClassificationValue"] == data2.get("strategy_value"):
+                result["strategy_value_id"] = item["ClassificationId"]
+                break
+
+        # Loop to find strategy_value_id
+        for item in all_asset_types:
+            if item["AssetTypeName"] == data2.get("security_type"):
+                result["security_type_id"] = item["AssetTypeId"]
+                break
+
+        return result
+
+    id_str_type = get_ids(data2, all_strategy, all_asset_types)
+    data2.update(id_str_type)
+
+    combined_result = {**data1, **data2}
+    # step1_asset_result = json.dumps(combined_result, indent=4)
+    #----------------------------Verification---------------------------------------
+    step1_asset_result = json.dumps(combined_result, indent=4)
+
+    # Convert JSON string back to dict before using `.get()`
+    step1_asset_dict = json.loads(step1_asset_result)
+
+    # Modify the full_name
+    original_name = step1_asset_dict.get("full_name", "")
+    step1_asset_dict["full_name"] = f"Vasanth Test 1 - {original_name}"
+
+    # Convert back to JSON string if needed
+    step1_asset_result_1 = json.dumps(step1_asset_dict, indent=4)
+    step1_asset_result = json.loads(step1_asset_result_1)
+    #----------------------------Verification---------------------------------------
+
+    # step1_asset_result = {
+    #     "full_name": "Caligan Partners Onshore LP",
+    #     "abbreviation": "CPOL",
+    #     "date_of_inception": "2022-02-01",
+    #     "security_type": "Mutual Fund",
+    #     "strategy_value": "Long/Short Equity"
+    # }
+
+    # Step 1 
+    genAIDocumentId = 107
+    # Create a list of key-value entries
+    batch_payload = [
+        {
+            "genAIDocumentId": genAIDocumentId,
+            "keyName": key,
+            "keyValue": value
+        }
+        for key, value in step1_asset_result.items()
+        if key not in {"security_type_id", "strategy_value_id"}
+    ]
+    # print(batch_payload)   
+    # Queue for the batched InsertDocKeyValues call
+    key_value_writer.add(batch_payload)
+    print(f"Queued {len(batch_payload)} key values for insert")
+    # Fetch all steps
     try:
-        document_id = doc.get("DocumentId")
-        if not document_id:
-            print("Skipping entry due to missing DocumentId")
-            continue
-
-        response = client.make_request(f"{get_document}/{document_id}")
-        document_response = response
-        output_path = doc.get("ActivityId")
-        document_name = document_response.get("DocumentName")
-        document_content = document_response.get("DocumentContent")
-
-        if output_path and document_content and document_name:
-            # PDFHandler.save_base64_as_pdf(document_content, output_path, document_name)
-            print(f"Saved document: {output_path}/{document_name}")
-        else:
-            print(f"Warning: Missing DocumentName or DocumentContent for ID {document_id}")
-
-    except requests.exceptions.RequestException as e:
-        print(f"Request error while processing document {document_id}: {e}")
-    except KeyError as e:
-        print(f"Missing expected key in response for Document ID {document_id}: {e}")
+        Get_All_Steps = client.get_request(GetAllSteps)
+        print("Fetched Steps:", Get_All_Steps)
     except Exception as e:
-        print(f"Unexpected error processing Document ID {document_id}: {e}")
-
-# subprocess.run([sys.executable, "vector_store.py"], check=True)
-print("Vector store updated successfully.")
-
-if not unprocessed_documents:
-    print("No unprocessed documents found.")
-else:
-    print("Unprocessed Documents:", unprocessed_documents)
-
-activity_id = "1863"
-# Preprocessing steps
-# Update Processed For All - once file downloaded and stored in vector database
-# try:
-#     UpdateProcessedForAll_payload = [doc["ActivityId"] for doc in unprocessed_documents]
-#     if UpdateProcessedForAll_payload:
-#         GenAI/UpdateProcessedForDoc/{genAIDocumentId}
-#         UpdateProcessedForAll_url = f"/GenAI/UpdateProcessedForAll/{UpdateProcessedForAll_payload}"
-#         Update_Processed_ForAll = client.post_request(endpoint=UpdateProcessedForAll_url)
-#         print("Update Processed For All:", Update_Processed_ForAll)
-#     else:
-#         print("No documents to update.")
-# except Exception as e:
-#     print(f"Error updating processed documents: {e}")
-
-# Step 1 Starts: Dropdown API Calls
-all_asset_types = client.get_request(dropdown_asset_types)
-print("all_asset_types:", all_asset_types)
-asset_type_names = [asset['AssetTypeName'] for asset in all_asset_types]
-# print("asset_type_names:", asset_type_names)
-all_strategy = client.get_request(dropdown_strategy)
-print("all_strategy:", all_strategy)
-strategy_values = [strategy['ClassificationValue'] for strategy in all_strategy]
-# print("strategy_values:", strategy_values)
-
-step1_result = run_crew_step1(activity_id)
-step1_2_result = run_crew_security_strategy(activity_id,asset_type_names,strategy_values)
-print(f"step1_result: {step1_result}")
-print(f"step1_2_result: {step1_2_result}")
-data1 = step1_result.to_dict()
-data2 = step1_2_result.to_dict()
-
-def get_ids(data2, all_strategy, all_asset_types):
-    result = {
-        "security_type_id": None,
-        "strategy_value_id": None
-    }
-
-    # Loop to find security_type_id
-    for item in all_strategy:
-        if item["ClassificationValue"] == data2.get("strategy_value"):
-            result["strategy_value_id"] = item["ClassificationId"]
-            break
-
-    # Loop to find strategy_value_id
-    for item in all_asset_types:
-        if item["AssetTypeName"] == data2.get("security_type"):
-            result["security_type_id"] = item["AssetTypeId"]
-            break
-
-    return result
-
-id_str_type = get_ids(data2, all_strategy, all_asset_types)
-data2.update(id_str_type)
-
-combined_result = {**data1, **data2}
-# step1_asset_result = json.dumps(combined_result, indent=4)
-#----------------------------Verification---------------------------------------
-step1_asset_result = json.dumps(combined_result, indent=4)
-
-# Convert JSON string back to dict before using `.get()`
-step1_asset_dict = json.loads(step1_asset_result)
-
-# Modify the full_name
-original_name = step1_asset_dict.get("full_name", "")
-step1_asset_dict["full_name"] = f"Vasanth Test 1 - {original_name}"
-
-# Convert back to JSON string if needed
-step1_asset_result_1 = json.dumps(step1_asset_dict, indent=4)
-step1_asset_result = json.loads(step1_asset_result_1)
-#----------------------------Verification---------------------------------------
-
-# step1_asset_result = {
-#     "full_name": "Caligan Partners Onshore LP",
-#     "abbreviation": "CPOL",
-#     "date_of_inception": "2022-02-01",
-#     "security_type": "Mutual Fund",
-#     "strategy_value": "Long/Short Equity"
-# }
-
-# Step 1 
-genAIDocumentId = 107
-# Create a list of key-value entries
-batch_payload = [
-    {
-        "genAIDocumentId": genAIDocumentId,
-        "keyName": key,
-        "keyValue": value
-    }
-    for key, value in step1_asset_result.items()
-    if key not in {"security_type_id", "strategy_value_id"}
-]
-# print(batch_payload)   
-# API call
-response = client.post_request(endpoint=InsertDocKeyValues, payload=batch_payload)
-print("Batch insert response Asset details:", response)
-# Fetch all steps
-try:
-    Get_All_Steps = client.get_request(GetAllSteps)
-    print("Fetched Steps:", Get_All_Steps)
-except Exception as e:
-    print(f"Error fetching steps: {e}")
-
-def get_step_id_by_name(steps_list, step_name):
-    for step in steps_list:
-        if step['StepName'] == step_name:
-            return step['StepId']
-    return None
-
-step_name = "Name Value Pair Insert"
-step_id = get_step_id_by_name(Get_All_Steps, step_name)
-print(f"Step ID for '{step_name}':", step_id)
-
-# Insert step results
-try:
-    InsertStepResult_payload = [
-        {"activityId": activity_id, "genAIDocumentId": genAIDocumentId, "stepId": step_id, "processResult": True , "processMessage": "Success"}]
-    Insert_Step_Result = client.post_request(endpoint=InsertStepResult, payload=InsertStepResult_payload)
-    print("Inserted Step Results:", Insert_Step_Result)
-except Exception as e:
-    print(f"Error inserting step results: {e}")
-print("Step 2: Asset creation")
-# Upload extracted data
-try:
-    formatted_data = client.format_asset_data(step1_asset_result)
-    asset_id = client.upload_asset(formatted_data)
-    print("asset_id:", asset_id)
-except Exception as e:
-    print(f"Error uploading data: {e}")
+        print(f"Error fetching steps: {e}")
 
-step_name = "Asset Creation"
-step_id = get_step_id_by_name(Get_All_Steps, step_name)
-print(f"Step ID for Asset Creation'{step_name}':", step_id)
-
-# Insert step results
-try:
-    InsertStepResult_payload = [
-        {"activityId": activity_id, "genAIDocumentId": genAIDocumentId, "stepId": step_id, "processResult": True , "processMessage": "Success"}]
-    Insert_Step_Result = client.post_request(endpoint=InsertStepResult, payload=InsertStepResult_payload)
-    print("Inserted Step Results:", Insert_Step_Result)
-except Exception as e:
-    print(f"Error inserting step results: {e}")
-
-print("Step 6: Asset returns creation")
-step6_result = run_crew_step6(activity_id)
-print(f"step1_result: {step1_result}")
-print(f"step1_2_result: {step1_2_result}")
-print(f"step6_result: {step6_result}")
-
-base_payload = {
-    "rorValuationId": 0,
-    "navValuationId": 0,
-    "entityTypeId": 1,
-    "entityId": 56746,
-    "entityName": "string",
-    "frequencyId": 3,
-    "valuationDate": "",  # will be updated
-    "rorValue": 0.0,      # will be updated
-    "navValue": 0,
-    "estimateActual": "string",
-    "modifiedBy": 0,
-    "modifiedByName": "string",
-    "modifiedDate": "2025-04-10T13:03:24.491Z",
-    "entityMasterId": 0
-}
+    def get_step_id_by_name(steps_list, step_name):
+        for step in steps_list:
+            if step['StepName'] == step_name:
+                return step['StepId']
+        return None
 
-# Loop through and send payloads
-for record in step6_result['records']:
-    assert_return_payload = base_payload.copy()
-    assert_return_payload["valuationDate"] = record["valuationDate"]
-    assert_return_payload["rorValue"] = record["rorValue"]
-    assert_return_payload["entityId"] = asset_id
+    # (processResult, processMessage) per step; queued once the key values are flushed
+    step_outcomes = {}
 
+    print("Step 2: Asset creation")
+    # Upload extracted data
+    asset_id = None
     try:
-        response  = client.post_request(endpoint= "/AssetValuation/InsertUpdateAssetValuation", payload=assert_return_payload)
-        print(f"✅ Success: {record['valuationDate']} inserted. Response: {response}")
+        with stage("asset_creation", activity_id):
+            formatted_data = client.format_asset_data(step1_asset_result)
+            asset_id = client.upload_asset(formatted_data)
+        print("asset_id:", asset_id)
+        step_outcomes["Asset Creation"] = (asset_id is not None, "Success" if asset_id is not None else "No asset id returned")
     except Exception as e:
-        print(f"❌ Failed for {record['valuationDate']}: {response.status_code} - {response.text}")
-        print(f"Exception: {Exception}")
-# Create a list of key-value entries
-batch_payload = [
-    {
-        "genAIDocumentId": genAIDocumentId,
-        "keyName": "returns_creation",
-        "keyValue": json.dumps(step6_result['records'])
+        print(f"Error uploading data: {e}")
+        step_outcomes["Asset Creation"] = (False, f"Asset upload failed: {e}")
+
+    print("Step 6: Asset returns creation")
+    if extraction_mode != "consolidated":
+        step6_result = run_crew_step6(activity_id)
+    print(f"step1_result: {data1}")
+    print(f"step1_2_result: {data2}")
+    print(f"step6_result: {step6_result}")
+
+    base_payload = {
+        "rorValuationId": 0,
+        "navValuationId": 0,
+        "entityTypeId": 1,
+        "entityId": 56746,
+        "entityName": "string",
+        "frequencyId": 3,
+        "valuationDate": "",  # will be updated
+        "rorValue": 0.0,      # will be updated
+        "navValue": 0,
+        "estimateActual": "string",
+        "modifiedBy": 0,
+        "modifiedByName": "string",
+        "modifiedDate": "2025-04-10T13:03:24.491Z",
+        "entityMasterId": 0
     }
-]
-# print(batch_payload)   
-# API call
-response = client.post_request(endpoint=InsertDocKeyValues, payload=batch_payload)
-print("Batch insert response Asset details:", response)
-
-step_name = "Returns Creation"
-step_id = get_step_id_by_name(Get_All_Steps, step_name)
-print(f"Step ID for Returns Creation'{step_name}':", step_id)
 
-# Insert step results
-try:
-    InsertStepResult_payload = [
-        {"activityId": activity_id, "genAIDocumentId": genAIDocumentId, "stepId": step_id, "processResult": True , "processMessage": "Success"}]
-    Insert_Step_Result = client.post_request(endpoint=InsertStepResult, payload=InsertStepResult_payload)
-    print("Inserted Step Results:", Insert_Step_Result)
-except Exception as e:
-    print(f"Error inserting step results: {e}")
-exit()
+    # Loop through and send payloads
+    failed_returns = 0
+    with stage("returns_upload", activity_id):
+        for record in step6_result['records'] if asset_id is not None else []:
+            assert_return_payload = base_payload.copy()
+            assert_return_payload["valuationDate"] = record["valuationDate"]
+            assert_return_payload["rorValue"] = record["rorValue"]
+            assert_return_payload["entityId"] = asset_id
+
+            try:
+                response  = client.post_request(endpoint= "/AssetValuation/InsertUpdateAssetValuation", payload=assert_return_payload)
+                print(f"✅ Success: {record['valuationDate']} inserted. Response: {response}")
+            except Exception as e:
+                failed_returns += 1
+                print(f"❌ Failed for {record['valuationDate']}: {e}")
+    if asset_id is None:
+        step_outcomes["Returns Creation"] = (False, "Skipped: asset was not created")
+    elif not step6_result['records']:
+        step_outcomes["Returns Creation"] = (False, "No returns extracted")
+    elif failed_returns:
+        step_outcomes["Returns Creation"] = (False, f"{failed_returns} of {len(step6_result['records'])} returns failed to upload")
+    else:
+        step_outcomes["Returns Creation"] = (True, "Success")
+    # Create a list of key-value entries
+    batch_payload = [
+        {
+            "genAIDocumentId": genAIDocumentId,
+            "keyName": "returns_creation",
+            "keyValue": json.dumps(step6_result['records'])
+        }
+    ]
+    # print(batch_payload)   
+    # Queue for the batched InsertDocKeyValues call
+    key_value_writer.add(batch_payload)
+    print(f"Queued {len(batch_payload)} key values for insert")
+
+    def flush(writer):
+        """Flush buffered writes and report per-record failures"""
+        with stage("flush_writes", activity_id):
+            writer.close()
+        for outcome in writer.outcomes:
+            if not outcome["ok"]:
+                print(f"Failed write to {writer.endpoint}: {outcome['record']} - {outcome['error']}")
+
+    # The name/value step succeeds only if its key values were extracted and written
+    flush(key_value_writer)
+    failed_keys = {
+        outcome["record"]["keyName"] for outcome in key_value_writer.outcomes
+        if not outcome["ok"] and outcome["record"]["keyName"] != "returns_creation"
+    }
+    if not original_name or original_name == "not found":
+        step_outcomes["Name Value Pair Insert"] = (False, "Fund name was not extracted")
+    elif failed_keys:
+        step_outcomes["Name Value Pair Insert"] = (False, f"Failed to insert key values: {', '.join(sorted(failed_keys))}")
+    else:
+        step_outcomes["Name Value Pair Insert"] = (True, "Success")
+
+    # Queue step results for the batched InsertStepResult call
+    for step_name in ("Name Value Pair Insert", "Asset Creation", "Returns Creation"):
+        step_id = get_step_id_by_name(Get_All_Steps, step_name)
+        print(f"Step ID for '{step_name}':", step_id)
+        process_result, process_message = step_outcomes[step_name]
+        InsertStepResult_payload = [
+            {"activityId": activity_id, "genAIDocumentId": genAIDocumentId, "stepId": step_id, "processResult": process_result, "processMessage": process_message}]
+        step_result_writer.add(InsertStepResult_payload)
+    flush(step_result_writer)
+
+    # Record completed steps so housekeeping can retire finished activities
+    record_step_results(step_result_writer.outcomes, {step['StepId']: step['StepName'] for step in Get_All_Steps})
+
+    # Finish ingesting the other activities' documents before exiting
+    wait_for_ingestion()
+    ingestion_executor.shutdown()
+    print("Vector store updated successfully.")
+    exit()
 """
 print("Step3 Asset Attributes: ")
 Attribute_creation_payload = {
@@ -0,0 +1,20 @@
+import yaml
+
+_config_cache = {}
+
+
+# Load configuration once per process and share it across modules
+def load_config(path: str = "config.yaml") -> dict:
+    if path not in _config_cache:
+        try:
+            with open(path, "r") as file:
+                _config_cache[path] = yaml.safe_load(file) or {}
+        except (FileNotFoundError, yaml.YAMLError) as e:
+            print(f"Error loading config file: {e}")
+            _config_cache[path] = {}
+    return _config_cache[path]
+
+
+def get_section(name: str, path: str = "config.yaml") -> dict:
+    """Return one top-level section of config.yaml, or an empty dict"""
+    return load_config(path).get(name) or {}
@@ -1,10 +1,17 @@
+from profiling import profiled
+
+
+@profiled("step1_2_crew")
 def run_crew_security_strategy(collection_name, asset_type_names, strategy_values):
     from crewai import Agent, Task, Crew, Process
-    from langchain_chroma import Chroma
-    from langchain_openai import OpenAIEmbeddings
+    from chroma_store import get_vector_store
+    from rate_limiter import crew_llm
+    from summaries import format_summaries, load_summaries
     from crewai.tools import tool
     from pydantic import BaseModel, Field
     import os
+    # Every agent's OpenAI calls go through the shared rate limiter
+    llm = crew_llm()
 
     max_iterations = 1
 
@@ -15,16 +22,21 @@ def run_crew_security_strategy(collection_name, asset_type_names, strategy_value
 
     # Initialize ChromaDB
     def initialize_chroma(collection_name):
-        embeddings = OpenAIEmbeddings(
-            openai_api_key=os.getenv("OPENAI_API_KEY")
-        )
-        return Chroma(
-            persist_directory=f"chroma_db/{collection_name}",
-            embedding_function=embeddings
-        )
+        return get_vector_store(collection_name)
 
     chroma_db = initialize_chroma(collection_name)
 
+    @tool
+    def document_summaries_retriever(query: str = "") -> str:
+        """Retrieves the precomputed key-facts digest of every document in the collection. Check these first."""
+        try:
+            return format_summaries(collection_name)
+        except Exception as e:
+            return f"ERROR|FAILED_PERMANENTLY|{str(e)}"
+
+    # Offer the digests only when this activity has any, to avoid a wasted tool call
+    summary_tools = [document_summaries_retriever] if load_summaries(collection_name) else []
+
     # Enhanced search tool with dynamic query generation
     @tool
     def security_type_search():
@@ -59,6 +71,7 @@ def run_crew_security_strategy(collection_name, asset_type_names, strategy_value
 
     # Enhanced Security Agent
     security_analyst = Agent(
+        llm=llm,
         role="Security Classification Specialist",
         goal="Match document context to closest security type from dropdown options",
         backstory=(
@@ -66,7 +79,7 @@ def run_crew_security_strategy(collection_name, asset_type_names, strategy_value
             "security structures and regulatory terminology. Skilled in "
             "interpreting legal definitions and matching to standardized categories."
         ),
-        tools=[security_type_search],
+        tools=[*summary_tools, security_type_search],
         verbose=True,
         max_iterations=max_iterations,  # More analysis cycles
         memory=True,
@@ -95,6 +108,7 @@ def run_crew_security_strategy(collection_name, asset_type_names, strategy_value
 
     # Enhanced Strategy Agent
     strategy_analyst = Agent(
+        llm=llm,
         role="Investment Strategy Analyst",
         goal="Match investment approach to closest strategy value from dropdown options",
         backstory=(
@@ -102,7 +116,7 @@ def run_crew_security_strategy(collection_name, asset_type_names, strategy_value
             "portfolio descriptions to standardized strategy categories. "
             "Skilled in interpreting allocation tables and investment mandates."
         ),
-        tools=[strategy_value_search],
+        tools=[*summary_tools, strategy_value_search],
         verbose=True,
         max_iterations=max_iterations,
         memory=True,
@@ -131,6 +145,7 @@ def run_crew_security_strategy(collection_name, asset_type_names, strategy_value
 
     # Enhanced Validation Agent
     final_validator = Agent(
+        llm=llm,
         role="Financial Data Validator",
         goal="Ensure accurate mapping to dropdown values",
         backstory=(
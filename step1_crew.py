@@ -1,25 +1,28 @@
+from profiling import profiled
+
+
+@profiled("step1_crew")
 def run_crew_step1(collection_name):
     import os
     import sys
     from dotenv import load_dotenv
     from crewai import Agent, Task, Crew, Process
-    from langchain_chroma import Chroma
-    from langchain_openai import OpenAIEmbeddings
+    from chroma_store import get_vector_store
+    from rate_limiter import crew_llm
+    from summaries import format_summaries, load_summaries
     from crewai.tools import tool
     from pydantic import BaseModel, Field
     from typing import List
     import json
     import warnings
     warnings.filterwarnings("ignore", category=UserWarning, module="onnxruntime.*")
+    # Every agent's OpenAI calls go through the shared rate limiter
+    llm = crew_llm()
     collection_name = collection_name  # Default fallback
     max_iterations = 1
     # Initialize ChromaDB once
-    def initialize_chroma(folder_path: str = "chroma_db", collection_name: str = collection_name):
-        embeddings = OpenAIEmbeddings(openai_api_key=os.getenv("OPENAI_API_KEY"))
-        return Chroma(
-            persist_directory=os.path.join(folder_path, collection_name),
-            embedding_function=embeddings
-        )
+    def initialize_chroma(collection_name: str = collection_name):
+        return get_vector_store(collection_name)
 
     # Initialize ChromaDB instance
     chroma_db = initialize_chroma()
@@ -38,6 +41,17 @@ def run_crew_step1(collection_name):
             'date_of_inception': crew_output.date_of_inception
         }
 
+    @tool
+    def document_summaries_retriever(query: str = "") -> str:
+        """Retrieves the precomputed key-facts digest of every document in the collection. Check these first."""
+        try:
+            return format_summaries(collection_name)
+        except Exception as e:
+            return f"ERROR|FAILED_PERMANENTLY|{str(e)}"
+
+    # Offer the digests only when this activity has any, to avoid a wasted tool call
+    summary_tools = [document_summaries_retriever] if load_summaries(collection_name) else []
+
     @tool
     def document_chunks_retriever(query: str = "") -> str:  # Add default value
         """Retrieves first 5 document chunks from each file in collection"""
@@ -74,11 +88,12 @@ def run_crew_step1(collection_name):
 
     # Define your agent with enhanced prompting
     fund_metadata_agent = Agent(
+        llm=llm,
         role="Financial Document Analyst",
         goal="Accurately extract fund names and abbreviations from document content",
         verbose=True,
         memory=True,
-        tools=[document_chunks_retriever],
+        tools=[*summary_tools, document_chunks_retriever],
         backstory=(
             "Expert financial document analyst with rigorous attention to detail. "
             "Specializes in identifying official fund names and abbreviations "
@@ -120,10 +135,11 @@ def run_crew_step1(collection_name):
 
     # Specialized Agent for Dates
     date_analyst = Agent(
+        llm=llm,
         role="Temporal Data Specialist",
         goal="Accurately identify dates of inception from financial documents",
         verbose=True,
-        tools=[inception_date_retriever],
+        tools=[*summary_tools, inception_date_retriever],
         backstory=(
             "Expert in temporal pattern recognition with a focus on financial documents. "
             "Specializes in identifying exact dates from complex legal language."
@@ -1,26 +1,97 @@
+from profiling import profiled
+
+
+def validate_returns(records, annual_returns=None, tolerance=0.15):
+    """Validate a monthly return series in one vectorised pass.
+
+    Checks month-end dates, duplicated and missing months, and that the
+    monthly values of each year compound to the YTD/annual figure reported
+    in the table (within `tolerance` percentage points).
+
+    Returns {year: [issue, ...]} for every year that fails a check. A date
+    that cannot be parsed is reported against the year it starts with.
+    """
+    import numpy as np
+
+    issues = {}
+
+    def flag(years, message):
+        for year in np.unique(np.asarray(years)):
+            issues.setdefault(int(year), []).append(message)
+
+    # Impossible dates (e.g. 2023-02-29) are reported against their year and left out of the other checks
+    parsed = []
+    for record in records:
+        text = str(record.get("valuationDate", ""))[:10]
+        try:
+            parsed.append((np.datetime64(text, "D"), record["rorValue"]))
+        except ValueError:
+            if text[:4].isdigit():
+                flag([int(text[:4])], "unparseable valuation date")
+
+    if not parsed:
+        return issues
+
+    dates = np.array([date for date, _ in parsed], dtype="datetime64[D]")
+    values = np.array([value for _, value in parsed], dtype=float)
+    months = dates.astype("datetime64[M]")
+    years = months.astype("datetime64[Y]").astype(int) + 1970
+
+    # Every valuation date must be the last calendar day of its month
+    month_ends = (months + 1).astype("datetime64[D]") - 1
+    not_month_end = dates != month_ends
+    if not_month_end.any():
+        flag(years[not_month_end], "valuation date is not a month end")
+
+    # Each month may appear only once
+    unique_months, first_index, counts = np.unique(months, return_index=True, return_counts=True)
+    if (counts > 1).any():
+        flag(years[first_index[counts > 1]], "duplicated month")
+
+    # Calendar continuity between the first and last reported month
+    month_numbers = unique_months.astype(int)
+    expected = np.arange(month_numbers[0], month_numbers[-1] + 1)
+    missing = np.setdiff1d(expected, month_numbers)
+    if missing.size:
+        flag(missing // 12 + 1970, "missing month")
+
+    # Monthly values must compound to the reported YTD/annual figure
+    if annual_returns:
+        unique_years, year_index = np.unique(years[first_index], return_inverse=True)
+        compounded = np.expm1(np.bincount(year_index, weights=np.log1p(values[first_index] / 100.0))) * 100.0
+        reported_years = np.array(list(annual_returns.keys()), dtype=int)
+        reported_values = np.array(list(annual_returns.values()), dtype=float)
+        known = np.isin(reported_years, unique_years)
+        positions = np.searchsorted(unique_years, reported_years[known])
+        mismatch = np.abs(compounded[positions] - reported_values[known]) > tolerance
+        if mismatch.any():
+            flag(reported_years[known][mismatch], "monthly values do not compound to the reported YTD")
+
+    return issues
+
+
+@profiled("step6_crew")
 def run_crew_step6(collection_name):
     import os
     import sys
     from dotenv import load_dotenv
     from crewai import Agent, Task, Crew, Process
-    from langchain_chroma import Chroma
-    from langchain_openai import OpenAIEmbeddings
+    from chroma_store import get_vector_store
+    from rate_limiter import crew_llm
     from crewai.tools import tool
     from pydantic import BaseModel, Field
     from typing import List
     import json
     import warnings
     warnings.filterwarnings("ignore", category=UserWarning, module="onnxruntime.*")
+    # Every agent's OpenAI calls go through the shared rate limiter
+    llm = crew_llm()
 
     collection_name = collection_name
     max_iterations = 1
 
-    def initialize_chroma(folder_path: str = "chroma_db", collection_name: str = collection_name):
-        embeddings = OpenAIEmbeddings(openai_api_key=os.getenv("OPENAI_API_KEY"))
-        return Chroma(
-            persist_directory=os.path.join(folder_path, collection_name),
-            embedding_function=embeddings
-        )
+    def initialize_chroma(collection_name: str = collection_name):
+        return get_vector_store(collection_name)
 
     # Initialize ChromaDB instance
     chroma_db = initialize_chroma()
@@ -29,8 +100,13 @@ def run_crew_step6(collection_name):
         valuationDate: str = Field(..., pattern=r"\d{4}-\d{2}-\d{2}T00:00:00Z")
         rorValue: float = Field(..., ge=-100.0, le=100.0)
 
+    class AnnualReturn(BaseModel):
+        year: int = Field(..., description="Calendar year of the YTD/annual figure")
+        ytdValue: float = Field(..., ge=-100.0, description="YTD/annual return as reported in the table")
+
     class TimeSeriesCollection(BaseModel):
         records: list[TimeSeriesRecord] = Field(..., description="Array of time series records")
+        annual_returns: list[AnnualReturn] = Field(default_factory=list, description="YTD/annual figures reported in the table")
 
     @tool
     def performance_table_retriever(query: str = "") -> str:
@@ -70,6 +146,7 @@ def run_crew_step6(collection_name):
             return f"ERROR|FAILED_PERMANENTLY|{str(e)}"
 
     time_agent = Agent(
+        llm=llm,
         role="Financial Table Processor",
         goal="Extract all monthly return values from performance tables",
         verbose=True,
@@ -84,13 +161,17 @@ def run_crew_step6(collection_name):
 
     time_task = Task(
         description=(
-            "Analyze all performance tables and extract every monthly value..."
+            "Analyze all performance tables and extract every monthly value...\n"
+            "Also extract the YTD/annual figure reported for each year, if the table has one."
         ),
         agent=time_agent,
         expected_output="""{
           "records": [
             {"valuationDate": "2024-01-31T00:00:00Z", "rorValue": 1.59},
             {"valuationDate": "2024-02-29T00:00:00Z", "rorValue": 11.30}
+          ],
+          "annual_returns": [
+            {"year": 2024, "ytdValue": 13.07}
           ]
         }""",
         output_json=TimeSeriesCollection
@@ -104,4 +185,69 @@ def run_crew_step6(collection_name):
     )
 
     result = time_series_crew.kickoff()
+
+    # Validate the whole series and re-extract only the years that fail
+    data = result.json_dict or {}
+    records = data.get("records", [])
+    annual_returns = {item["year"]: item["ytdValue"] for item in data.get("annual_returns", [])}
+    failing = validate_returns(records, annual_returns)
+    if not failing:
+        return result
+    for year, problems in sorted(failing.items()):
+        print(f"Returns validation failed for {year}: {', '.join(problems)}")
+
+    @tool
+    def year_performance_retriever(year: str) -> str:
+        """Retrieves performance table chunks for a single calendar year."""
+        try:
+            results = chroma_db.similarity_search(
+                f"{year} monthly returns performance table net of fees YTD",
+                k=5
+            )
+            return "\n\n--- DOCUMENT CHUNK ---\n".join([doc.page_content for doc in results])
+        except Exception as e:
+            return f"ERROR|FAILED_PERMANENTLY|{str(e)}"
+
+    failing_years = sorted(failing)
+    repair_agent = Agent(
+        llm=llm,
+        role="Financial Table Processor",
+        goal="Re-extract monthly return values for specific years that failed validation",
+        verbose=True,
+        tools=[year_performance_retriever],
+        backstory=(
+            "Expert in financial data extraction with meticulous attention to table structures."
+        ),
+        max_iterations=1,
+        early_stopping_method="force_final_answer"
+    )
+    repair_task = Task(
+        description=(
+            f"Re-extract the monthly returns for these years only: {failing_years}.\n"
+            f"Previous extraction failed validation: {failing}.\n"
+            "Return exactly one record per calendar month, dated on the last day of the month, "
+            "and the YTD/annual figure reported for each year."
+        ),
+        agent=repair_agent,
+        expected_output=time_task.expected_output,
+        output_json=TimeSeriesCollection
+    )
+    repair = Crew(agents=[repair_agent], tasks=[repair_task], process=Process.sequential, verbose=True).kickoff()
+    repaired = repair.json_dict or {}
+    repaired_annual = {item["year"]: item["ytdValue"] for item in repaired.get("annual_returns", [])}
+
+    # Replace a year's records only when the re-extracted year validates cleanly
+    for year in failing_years:
+        year_records = [r for r in repaired.get("records", []) if r["valuationDate"].startswith(str(year))]
+        year_annual = {y: v for y, v in {**annual_returns, **repaired_annual}.items() if y == year}
+        if year_records and not validate_returns(year_records, year_annual):
+            records = [r for r in records if not r["valuationDate"].startswith(str(year))] + year_records
+            annual_returns.update(year_annual)
+            print(f"Re-extracted returns for {year}")
+        else:
+            print(f"Re-extraction for {year} still fails validation; keeping original values")
+
+    records.sort(key=lambda r: r["valuationDate"])
+    result.json_dict["records"] = records
+    result.json_dict["annual_returns"] = [{"year": year, "ytdValue": value} for year, value in sorted(annual_returns.items())]
     return result
\ No newline at end of file
@@ -0,0 +1,135 @@
+import os
+import json
+from settings import get_section
+import chroma_store
+
+# Per-document summary settings (config.yaml -> summaries)
+_settings = get_section("summaries")
+ENABLED = os.getenv("BUILD_SUMMARIES", str(_settings.get("enabled", False))).lower() in ("1", "true", "yes")
+CACHE_DIRECTORY = _settings.get("cache_directory", "summary_cache")
+CACHE_MAX_SIZE_MB = float(_settings.get("cache_max_size_mb", 256))
+SECTION_CHARS = int(_settings.get("section_chars", 8000))
+MODEL = _settings.get("model") or os.getenv("OPENAI_MODEL_NAME", "gpt-4o-mini")
+# Bump when the prompts change, so cached summaries are rebuilt
+SUMMARY_VERSION = 1
+# Consolidated-layout summaries live here, one folder per activity
+CONSOLIDATED_SUMMARY_DIRECTORY = os.path.join(chroma_store.CONSOLIDATED_DIRECTORY, "summaries")
+
+SECTION_PROMPT = (
+    "Summarise this section of a fund document in at most 150 words. Keep every fund name, "
+    "abbreviation, date, security/vehicle type, investment strategy and performance figure exactly "
+    "as written.\n\nSection:\n{text}"
+)
+DIGEST_PROMPT = (
+    "From these section summaries of one fund document, write a key-facts digest as short bullet "
+    "points: official fund name, abbreviation, inception date, security/vehicle type, investment "
+    "strategy, fees and terms, and which years of monthly returns the document reports. Write "
+    "'not stated' for anything missing.\n\nSection summaries:\n{text}"
+)
+
+
+def summary_directory(activity):
+    """Summaries are stored next to the activity's collection"""
+    activity = str(activity)
+    if chroma_store.BACKEND == "flat":
+        return os.path.join(chroma_store.FLAT_DIRECTORY, activity, "summaries")
+    if chroma_store.LAYOUT == "consolidated":
+        return os.path.join(CONSOLIDATED_SUMMARY_DIRECTORY, activity)
+    return os.path.join(chroma_store.PERSIST_DIRECTORY, activity, "summaries")
+
+
+def _sections(documents):
+    """Group consecutive element texts into sections of roughly SECTION_CHARS characters"""
+    sections, current = [], ""
+    for doc in documents:
+        text = doc.page_content.strip()
+        if not text:
+            continue
+        if current and len(current) + len(text) > SECTION_CHARS:
+            sections.append(current)
+            current = ""
+        current = f"{current}\n\n{text}" if current else text
+    if current:
+        sections.append(current)
+    return sections
+
+
+def build_summary(documents):
+    """Hierarchical summary: one summary per section, then a key-facts digest of the document"""
+    from langchain_openai import ChatOpenAI
+    from rate_limiter import http_client
+    llm = ChatOpenAI(model=MODEL, temperature=0, openai_api_key=os.getenv("OPENAI_API_KEY"), http_client=http_client())
+    sections = _sections(documents)
+    section_summaries = [
+        message.content for message in llm.batch([SECTION_PROMPT.format(text=section) for section in sections])
+    ]
+    digest = llm.invoke(DIGEST_PROMPT.format(text="\n\n".join(section_summaries))).content if sections else ""
+    return {"digest": digest, "sections": section_summaries}
+
+
+def evict_cache(max_bytes=None):
+    """Remove least recently used cached summaries once the cache is larger than CACHE_MAX_SIZE_MB"""
+    max_bytes = CACHE_MAX_SIZE_MB * 1024 * 1024 if max_bytes is None else max_bytes
+    entries = []
+    for name in os.listdir(CACHE_DIRECTORY):
+        try:
+            stat = os.stat(os.path.join(CACHE_DIRECTORY, name))
+        except FileNotFoundError:
+            continue
+        entries.append((stat.st_mtime, stat.st_size, os.path.join(CACHE_DIRECTORY, name)))
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        total -= size
+
+
+def summarize_document(activity, file_path, documents, content_hash):
+    """Build (or reuse) the summary for one document and store it with the activity's collection"""
+    cache_path = os.path.join(CACHE_DIRECTORY, f"{content_hash}-v{SUMMARY_VERSION}-{MODEL.replace('/', '_')}.json")
+    if os.path.exists(cache_path):
+        with open(cache_path, "r") as cached:
+            summary = json.load(cached)
+        os.utime(cache_path)
+    else:
+        summary = build_summary(documents)
+        os.makedirs(CACHE_DIRECTORY, exist_ok=True)
+        with open(cache_path, "w") as cached:
+            json.dump(summary, cached)
+        evict_cache()
+
+    directory = summary_directory(activity)
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, f"{os.path.basename(file_path)}.json"), "w") as summary_file:
+        json.dump({"source": file_path, "content_hash": content_hash, **summary}, summary_file, indent=2)
+    print(f"Stored summary for {file_path} ({len(summary['sections'])} sections)")
+
+
+def load_summaries(activity):
+    directory = summary_directory(activity)
+    if not os.path.isdir(directory):
+        return []
+    summaries = []
+    for name in sorted(os.listdir(directory)):
+        if name.endswith(".json"):
+            try:
+                with open(os.path.join(directory, name), "r") as summary_file:
+                    summaries.append(json.load(summary_file))
+            except (OSError, ValueError) as e:
+                print(f"Skipping unreadable summary {name}: {e}")
+    return summaries
+
+
+def format_summaries(activity, include_sections=False):
+    """Digests (and optionally section summaries) for every document of an activity, as tool output"""
+    blocks = []
+    for summary in load_summaries(activity):
+        block = f"--- DOCUMENT SUMMARY: {os.path.basename(summary['source'])} ---\n{summary['digest']}"
+        if include_sections:
+            block += "\n\nSections:\n" + "\n\n".join(summary["sections"])
+        blocks.append(block)
+    return "\n\n".join(blocks)
@@ -0,0 +1,94 @@
+import pytest
+from langchain_core.documents import Document
+
+chromadb = pytest.importorskip("chromadb")
+from chromadb.api.shared_system_client import SharedSystemClient
+import chroma_store
+from chroma_store import ActivityView
+
+WORDS = ["inception", "returns", "strategy", "fees"]
+
+
+class BagOfWords:
+    """Deterministic embeddings: one dimension per known word"""
+
+    def _embed(self, text):
+        return [float(word in text.lower()) + 0.01 * index for index, word in enumerate(WORDS)]
+
+    def embed_documents(self, texts):
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text):
+        return self._embed(text)
+
+
+@pytest.fixture
+def stores(tmp_path, monkeypatch):
+    monkeypatch.setattr(chroma_store, "PERSIST_DIRECTORY", str(tmp_path / "chroma_db"))
+    monkeypatch.setattr(chroma_store, "CONSOLIDATED_DIRECTORY", str(tmp_path / "chroma_db" / "_consolidated"))
+    monkeypatch.setattr(chroma_store, "BACKEND", "chroma")
+    monkeypatch.setattr(chroma_store, "SHARDS", 1)
+    monkeypatch.setattr(chroma_store, "get_embedding", BagOfWords)
+    monkeypatch.setattr(chroma_store, "_consolidated_client", None)
+    monkeypatch.setattr(chroma_store, "_open_collections", chroma_store.OrderedDict())
+    yield tmp_path
+    for _, client in chroma_store._open_collections.values():
+        if client is not None:
+            client.close()
+    if chroma_store._consolidated_client is not None:
+        chroma_store._consolidated_client.close()
+
+
+def test_scoped_filters_always_include_the_activity():
+    view = ActivityView(store=None, activity=1863)
+    assert view._scoped() == {"activity": "1863"}
+    assert view._scoped({"source": "a.pdf"}) == {"$and": [{"activity": "1863"}, {"source": "a.pdf"}]}
+    assert view._scoped({"source": "a.pdf", "page_number": 2}) == {
+        "$and": [{"activity": "1863"}, {"source": "a.pdf"}, {"page_number": 2}]
+    }
+    assert view._scoped({"$and": [{"source": "a.pdf"}, {"page_number": {"$gt": 1}}]}) == {
+        "$and": [{"activity": "1863"}, {"source": "a.pdf"}, {"page_number": {"$gt": 1}}]
+    }
+
+
+def test_add_documents_tags_rows_with_their_activity(stores, monkeypatch):
+    monkeypatch.setattr(chroma_store, "LAYOUT", "consolidated")
+    chroma_store.add_documents("1863", [Document(page_content="Fund inception 2015", metadata={"source": "a.pdf"})])
+    chroma_store.add_documents("1864", [Document(page_content="Monthly returns", metadata={"source": "b.pdf"})])
+
+    rows = chroma_store.get_vector_store("1863").get(include=["metadatas"])
+    assert rows["metadatas"] == [{"source": "a.pdf", "activity": "1863"}]
+    assert chroma_store.get_vector_store("1864").similarity_search("inception", k=4)[0].metadata["activity"] == "1864"
+
+
+def test_evicted_per_activity_stores_release_their_chroma_system(stores, monkeypatch):
+    monkeypatch.setattr(chroma_store, "LAYOUT", "per_activity")
+    monkeypatch.setattr(chroma_store, "MAX_OPEN_COLLECTIONS", 2)
+    for activity in ("1", "2", "3"):
+        chroma_store.add_documents(activity, [Document(page_content=f"returns {activity}", metadata={"source": "a.pdf"})])
+
+    open_paths = set(SharedSystemClient._identifier_to_system)
+    assert str(stores / "chroma_db" / "1") not in open_paths
+    assert {str(stores / "chroma_db" / "2"), str(stores / "chroma_db" / "3")} <= open_paths
+    # Re-opening an evicted activity starts a fresh client over the same files
+    assert chroma_store.get_vector_store("1").get()["documents"] == ["returns 1"]
+
+
+def test_rerunning_the_migration_upserts_in_place(stores, monkeypatch):
+    monkeypatch.setattr(chroma_store, "LAYOUT", "per_activity")
+    for activity in ("1863", "1864"):
+        chroma_store.add_documents(activity, [
+            Document(page_content="Fund inception 2015", metadata={"source": "a.pdf"}),
+            Document(page_content="Management fees", metadata={"source": "b.pdf"}),
+        ])
+
+    chroma_store.migrate_per_activity_stores(chroma_store.PERSIST_DIRECTORY)
+    chroma_store.migrate_per_activity_stores(chroma_store.PERSIST_DIRECTORY)
+
+    client = chromadb.PersistentClient(path=chroma_store.CONSOLIDATED_DIRECTORY)
+    try:
+        rows = client.get_collection(chroma_store.shard_name("1863")).get(include=["metadatas"])
+    finally:
+        client.close()
+    assert len(rows["ids"]) == 4
+    assert all(doc_id.split(":")[0] == meta["activity"] for doc_id, meta in zip(rows["ids"], rows["metadatas"]))
@@ -0,0 +1,130 @@
+import calendar
+import pytest
+import langchain_openai
+import chroma_store
+import summaries
+import step1_crew
+import step1_2_crew
+import step6_crew
+from consolidated_crew import run_consolidated_extraction
+
+ASSET_TYPES = ["Hedge Fund", "Mutual Fund"]
+STRATEGIES = ["Long/Short Equity", "Private Credit"]
+
+
+def monthly_records(year):
+    return [
+        {"valuationDate": f"{year}-{month:02d}-{calendar.monthrange(year, month)[1]:02d}T00:00:00Z", "rorValue": 1.0}
+        for month in range(1, 13)
+    ]
+
+
+VALID = {
+    "full_name": "Ibex Israel Public Equity Fund L.P.",
+    "abbreviation": "ibex",
+    "date_of_inception": "2022-02-01",
+    "security_type": "Hedge Fund",
+    "strategy_value": "Long/Short Equity",
+    "records": monthly_records(2023),
+    "annual_returns": [],
+}
+
+
+class Result:
+    def __init__(self, data):
+        self.data = data
+
+    def model_dump(self):
+        return self.data
+
+    to_dict = model_dump
+
+
+class FakeStore:
+    def __init__(self, error=None):
+        self.error = error
+
+    def get(self, **kwargs):
+        if self.error:
+            raise self.error
+        return {"metadatas": [{"source": "a.pdf"}], "documents": ["Ibex Israel Public Equity Fund L.P."]}
+
+    def similarity_search(self, query, **kwargs):
+        return []
+
+    def max_marginal_relevance_search(self, query, **kwargs):
+        return []
+
+
+@pytest.fixture
+def pipeline(monkeypatch):
+    """Stub the store, the structured LLM and the per-step crews; record which crews ran"""
+    state = {"store": FakeStore(), "extracted": dict(VALID), "llm_error": None, "prompts": [], "crews": []}
+
+    class FakeChatOpenAI:
+        def __init__(self, **kwargs):
+            pass
+
+        def with_structured_output(self, schema):
+            return self
+
+        def invoke(self, prompt):
+            state["prompts"].append(prompt)
+            if state["llm_error"]:
+                raise state["llm_error"]
+            return Result(state["extracted"])
+
+    def crew(name, data):
+        def run(*args):
+            state["crews"].append(name)
+            return Result(data)
+        return run
+
+    monkeypatch.setattr(langchain_openai, "ChatOpenAI", FakeChatOpenAI)
+    monkeypatch.setattr(chroma_store, "get_vector_store", lambda activity: state["store"])
+    monkeypatch.setattr(summaries, "format_summaries", lambda activity: "")
+    monkeypatch.setattr(step1_crew, "run_crew_step1", crew("step1", {"full_name": "crew"}))
+    monkeypatch.setattr(step1_2_crew, "run_crew_security_strategy", crew("step1_2", {"security_type": "crew"}))
+    monkeypatch.setattr(step6_crew, "run_crew_step6", crew("step6", {"records": "crew"}))
+    return state
+
+
+def run():
+    return run_consolidated_extraction("1863", ASSET_TYPES, STRATEGIES)
+
+
+def test_valid_extraction_runs_no_crews(pipeline):
+    step1, step1_2, step6 = run()
+    assert pipeline["crews"] == []
+    assert step1["abbreviation"] == "ibex"
+    assert step1_2 == {"security_type": "Hedge Fund", "strategy_value": "Long/Short Equity"}
+    assert len(step6["records"]) == 12
+
+
+@pytest.mark.parametrize("override, crews", [
+    ({"abbreviation": "not found"}, ["step1"]),
+    ({"date_of_inception": "February 2022"}, ["step1"]),
+    ({"security_type": "Closed-End Fund"}, ["step1_2"]),
+    ({"strategy_value": "N/A"}, []),
+    ({"records": []}, ["step6"]),
+    ({"records": monthly_records(2023)[:5] + monthly_records(2023)[6:]}, ["step6"]),
+    ({"annual_returns": [{"year": 2023, "ytdValue": 2.0}]}, ["step6"]),
+])
+def test_only_field_groups_that_fail_validation_fall_back(pipeline, override, crews):
+    pipeline["extracted"].update(override)
+    run()
+    assert pipeline["crews"] == crews
+
+
+def test_llm_failure_falls_back_to_every_crew(pipeline):
+    pipeline["llm_error"] = RuntimeError("rate limited")
+    step1, step1_2, step6 = run()
+    assert pipeline["crews"] == ["step1", "step1_2", "step6"]
+    assert (step1, step1_2, step6) == ({"full_name": "crew"}, {"security_type": "crew"}, {"records": "crew"})
+
+
+def test_retrieval_failure_skips_the_llm_and_falls_back_to_every_crew(pipeline):
+    pipeline["store"] = FakeStore(error=RuntimeError("collection is locked"))
+    run()
+    assert pipeline["prompts"] == []
+    assert pipeline["crews"] == ["step1", "step1_2", "step6"]
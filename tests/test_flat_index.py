@@ -0,0 +1,60 @@
+import numpy as np
+import pytest
+from langchain_core.documents import Document
+from flat_index import FlatIndex
+
+WORDS = ["inception", "returns", "strategy", "fees", "custodian", "auditor"]
+
+
+class BagOfWords:
+    """Deterministic embeddings: one dimension per known word"""
+
+    def _embed(self, text):
+        return [float(word in text.lower()) + 0.01 * index for index, word in enumerate(WORDS)]
+
+    def embed_documents(self, texts):
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text):
+        return self._embed(text)
+
+
+DOCUMENTS = [
+    Document(page_content="Fund inception was March 2015", metadata={"source": "a.pdf", "page_number": 1}),
+    Document(page_content="Monthly returns table", metadata={"source": "a.pdf", "page_number": 2, "element_type": "Table"}),
+    Document(page_content="Investment strategy: long/short credit", metadata={"source": "b.pdf", "page_number": 1}),
+    Document(page_content="Management fees of 1.5%", metadata={"source": "b.pdf", "page_number": 3}),
+]
+
+
+@pytest.fixture(params=["float16", "int8"])
+def index(tmp_path, request):
+    index = FlatIndex(str(tmp_path / "flat"), BagOfWords(), quantize=request.param)
+    index.add_documents(DOCUMENTS, ids=["d1", "d2", "d3", "d4"])
+    return index
+
+
+def test_similarity_search_finds_the_closest_chunk(index):
+    assert index.similarity_search("inception date", k=1)[0].page_content == "Fund inception was March 2015"
+
+
+def test_filters_restrict_results(index):
+    tables = index.similarity_search("returns", k=3, filter={"element_type": "Table"})
+    assert [doc.page_content for doc in tables] == ["Monthly returns table"]
+    later_pages = index.get(where={"$and": [{"source": "b.pdf"}, {"page_number": {"$gt": 1}}]})
+    assert later_pages["ids"] == ["d4"]
+    assert index.get(where={"source": {"$in": ["a.pdf"]}}, limit=1, include=[])["ids"] == ["d1"]
+
+
+def test_mmr_returns_distinct_documents(index):
+    results = index.max_marginal_relevance_search("strategy fees", k=2, fetch_k=4)
+    assert len({doc.page_content for doc in results}) == 2
+
+
+def test_index_persists_and_deletes(index, tmp_path):
+    index.delete(ids=["d1"])
+    reopened = FlatIndex(str(tmp_path / "flat"), BagOfWords(), quantize=index.quantize)
+    assert reopened.ids == ["d2", "d3", "d4"]
+    assert "inception" not in reopened.similarity_search("inception", k=1)[0].page_content
+    embeddings = reopened.get(include=["embeddings"])["embeddings"]
+    assert np.allclose(np.linalg.norm(np.asarray(embeddings, dtype=np.float32), axis=1), 1.0, atol=0.02)
@@ -0,0 +1,79 @@
+import random
+import pytest
+
+chromadb = pytest.importorskip("chromadb")
+import housekeeping
+
+
+def make_collection(path, rows=1500, deleted=400):
+    client = chromadb.PersistentClient(path=str(path))
+    collection = client.create_collection("12345", metadata={"hnsw:space": "cosine"})
+    ids = [f"id{i}" for i in range(rows)]
+    collection.add(
+        ids=ids,
+        embeddings=[[random.random() for _ in range(8)] for _ in range(rows)],
+        documents=[f"chunk {i}" for i in range(rows)],
+        metadatas=[{"source": f"doc{i % 3}.pdf"} for i in range(rows)]
+    )
+    if deleted:
+        collection.delete(ids=ids[:deleted])
+    return client
+
+
+def test_collection_with_deleted_index_entries_is_rebuilt(tmp_path):
+    client = make_collection(tmp_path)
+    assert housekeeping._hnsw_element_count(str(tmp_path), client.get_collection("12345")) == 1500
+
+    housekeeping.compact_chroma_directory(str(tmp_path))
+
+    collection = client.get_collection("12345")
+    assert [c.name for c in client.list_collections()] == ["12345"]
+    assert collection.count() == 1100
+    assert collection.metadata["hnsw:space"] == "cosine"
+    assert housekeeping._hnsw_element_count(str(tmp_path), collection) <= 1100
+
+
+def test_interrupted_swap_is_restored(tmp_path):
+    client = make_collection(tmp_path, rows=10, deleted=0)
+    client.get_collection("12345").modify(name="12345" + housekeeping.RETIRED_SUFFIX)
+
+    housekeeping.compact_chroma_directory(str(tmp_path))
+
+    assert [c.name for c in client.list_collections()] == ["12345"]
+    assert client.get_collection("12345").count() == 10
+
+
+def step_result(activity, step_id, process_result, ok=True):
+    record = {"activityId": activity, "genAIDocumentId": 107, "stepId": step_id, "processResult": process_result}
+    return {"record": record, "ok": ok}
+
+
+def test_only_activities_whose_steps_all_succeeded_are_retired(tmp_path, monkeypatch):
+    monkeypatch.setattr(housekeeping, "LEDGER_PATH", str(tmp_path / "ledger.json"))
+    monkeypatch.setattr(housekeeping, "ARCHIVE_DIRECTORY", str(tmp_path / "archive"))
+    monkeypatch.setattr(housekeeping, "DOCUMENT_ROOTS", [str(tmp_path / "data")])
+    for name in ("PERSIST_DIRECTORY", "FLAT_DIRECTORY", "CONSOLIDATED_DIRECTORY"):
+        monkeypatch.setattr(housekeeping.chroma_store, name, str(tmp_path / name.lower()))
+    monkeypatch.setattr(housekeeping.summaries, "CONSOLIDATED_SUMMARY_DIRECTORY", str(tmp_path / "summaries"))
+    for activity in ("1863", "1864", "1865"):
+        (tmp_path / "data" / activity).mkdir(parents=True)
+        (tmp_path / "data" / activity / "doc.pdf").write_bytes(b"%PDF")
+
+    step_names = {1: "Name Value Pair Insert", 2: "Asset Creation", 3: "Returns Creation"}
+    housekeeping.record_step_results([
+        step_result("1863", 1, True), step_result("1863", 2, True), step_result("1863", 3, True),
+        # Asset upload failed, so its returns were never created
+        step_result("1864", 1, True), step_result("1864", 2, False), step_result("1864", 3, False),
+        # Every step succeeded but the InsertStepResult write for one of them did not
+        step_result("1865", 1, True), step_result("1865", 2, True), step_result("1865", 3, True, ok=False),
+    ], step_names)
+
+    assert housekeeping.load_ledger()["1864"]["completed_steps"] == ["Name Value Pair Insert"]
+    assert housekeeping.completed_activities() == ["1863"]
+
+    housekeeping.run(compact=False, retire="archive")
+
+    assert (tmp_path / "archive" / "1863.zip").exists()
+    assert not (tmp_path / "data" / "1863").exists()
+    assert (tmp_path / "data" / "1864" / "doc.pdf").exists()
+    assert (tmp_path / "data" / "1865" / "doc.pdf").exists()
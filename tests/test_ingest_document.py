@@ -0,0 +1,43 @@
+import os
+import pytest
+
+vector_store = pytest.importorskip("vector_store")
+
+
+@pytest.fixture
+def data_folder(tmp_path, monkeypatch):
+    monkeypatch.setattr(vector_store, "base_folder", str(tmp_path / "data"))
+    monkeypatch.setattr(vector_store, "load_file", lambda file_path: [])
+    monkeypatch.setattr(vector_store, "split_documents", lambda documents: [])
+    return tmp_path / "data"
+
+
+@pytest.mark.parametrize("name", ["../../escape.pdf", "/etc/escape.pdf", "..\\..\\escape.pdf", "sub/dir/escape.pdf"])
+def test_document_names_cannot_leave_the_activity_folder(data_folder, tmp_path, name):
+    vector_store.ingest_document("1863", content=b"%PDF-1.4", file_name=name)
+    assert os.listdir(data_folder / "1863") == ["escape.pdf"]
+    assert not (tmp_path / "escape.pdf").exists()
+
+
+@pytest.mark.parametrize("name", ["", "..", "docs/", None])
+def test_empty_document_names_are_rejected(data_folder, name):
+    with pytest.raises(ValueError):
+        vector_store.ingest_document("1863", content=b"%PDF-1.4", file_name=name)
+
+
+def test_pdfs_pypdf_cannot_read_fall_back_to_the_default_loader(tmp_path, monkeypatch):
+    calls = []
+
+    class FakeLoader:
+        def __init__(self, file_path, **kwargs):
+            calls.append(kwargs)
+
+        def load(self):
+            return ["element"]
+
+    monkeypatch.setattr(vector_store, "UnstructuredFileLoader", FakeLoader)
+    broken = tmp_path / "broken.pdf"
+    broken.write_bytes(b"%PDF-1.4 not really a pdf")
+
+    assert vector_store.load_pdf(str(broken)) == ["element"]
+    assert calls == [{"mode": "elements"}]
@@ -0,0 +1,70 @@
+import pytest
+from langchain_core.documents import Document
+
+pypdf = pytest.importorskip("pypdf")
+vector_store = pytest.importorskip("vector_store")
+
+
+def test_consecutive_pages_with_one_strategy_form_a_run():
+    assert vector_store.group_page_runs([]) == []
+    assert vector_store.group_page_runs(["fast"]) == [(1, 1, "fast")]
+    assert vector_store.group_page_runs(["fast", "fast", "hi_res", "hi_res", "hi_res", "fast"]) == [
+        (1, 2, "fast"), (3, 5, "hi_res"), (6, 6, "fast")
+    ]
+
+
+def test_runs_are_split_into_ranges_of_at_most_max_pages():
+    runs = [(1, 7, "fast"), (8, 8, "hi_res"), (9, 12, "fast")]
+    assert vector_store.split_page_runs(runs, 3) == [
+        (1, 3, "fast"), (4, 6, "fast"), (7, 7, "fast"), (8, 8, "hi_res"), (9, 11, "fast"), (12, 12, "fast")
+    ]
+    assert vector_store.split_page_runs(runs, 100) == runs
+
+
+class PageLoader:
+    """Stands in for UnstructuredFileLoader: one element per page of the PDF it is given.
+
+    Elements carry the page number within that PDF, as unstructured reports it,
+    and the page width, which the test PDF uses to tell original pages apart.
+    """
+
+    def __init__(self, file_path, mode, strategy, **options):
+        self.file_path = file_path
+
+    def load(self):
+        return [
+            Document(page_content=f"width {int(page.mediabox.width)}", metadata={"page_number": index})
+            for index, page in enumerate(pypdf.PdfReader(self.file_path).pages, start=1)
+        ]
+
+
+@pytest.fixture
+def ten_page_pdf(tmp_path, monkeypatch):
+    monkeypatch.setattr(vector_store, "UnstructuredFileLoader", PageLoader)
+    writer = pypdf.PdfWriter()
+    for page_number in range(1, 11):
+        writer.add_blank_page(width=100 + page_number, height=100)
+    path = tmp_path / "fund.pdf"
+    with open(path, "wb") as pdf:
+        writer.write(pdf)
+    return str(path)
+
+
+@pytest.mark.parametrize("first_page, last_page", [(1, 10), (1, 4), (5, 7), (10, 10)])
+def test_page_ranges_report_absolute_page_numbers(ten_page_pdf, first_page, last_page):
+    docs = vector_store.partition_page_range(ten_page_pdf, first_page, last_page, "fast", page_count=10)
+
+    assert [doc.metadata["page_number"] for doc in docs] == list(range(first_page, last_page + 1))
+    assert [doc.page_content for doc in docs] == [f"width {100 + page}" for page in range(first_page, last_page + 1)]
+    assert all(doc.metadata["source"] == ten_page_pdf and doc.metadata["partition_strategy"] == "fast" for doc in docs)
+
+
+def test_split_runs_cover_every_page_once(ten_page_pdf):
+    runs = vector_store.group_page_runs(["fast"] * 3 + ["hi_res"] * 2 + ["fast"] * 5)
+    docs = [
+        doc
+        for first_page, last_page, strategy in vector_store.split_page_runs(runs, 2)
+        for doc in vector_store.partition_page_range(ten_page_pdf, first_page, last_page, strategy, page_count=10)
+    ]
+    assert [doc.metadata["page_number"] for doc in docs] == list(range(1, 11))
+    assert [doc.metadata["partition_strategy"] for doc in docs] == ["fast"] * 3 + ["hi_res"] * 2 + ["fast"] * 5
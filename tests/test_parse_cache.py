@@ -0,0 +1,91 @@
+import os
+import threading
+from langchain_core.documents import Document
+from parse_cache import ParseCache
+
+
+def elements(source, count=3):
+    return [
+        Document(page_content=f"element {i} " * 50, metadata={"source": source, "filename": os.path.basename(source), "page_number": i})
+        for i in range(count)
+    ]
+
+
+def test_hit_is_relabelled_with_the_new_location(tmp_path):
+    cache = ParseCache(str(tmp_path / "cache"))
+    cache.put("ab12", elements("data/1/fund.pdf"))
+
+    documents = cache.get("ab12", "data/2/copy.pdf")
+
+    assert [doc.metadata["source"] for doc in documents] == ["data/2/copy.pdf"] * 3
+    assert documents[0].metadata["filename"] == "copy.pdf"
+    assert documents[2].metadata["page_number"] == 2
+
+
+def test_concurrent_puts_of_the_same_content_do_not_collide(tmp_path):
+    cache = ParseCache(str(tmp_path / "cache"))
+    errors = []
+
+    def put(activity):
+        try:
+            for _ in range(20):
+                cache.put("same", elements(f"data/{activity}/fund.pdf", count=50))
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=put, args=(activity,)) for activity in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert len(cache.get("same", "data/9/fund.pdf")) == 50
+    assert not [name for _, _, files in os.walk(tmp_path) for name in files if name.endswith(".tmp")]
+
+
+def test_write_failures_are_not_fatal(tmp_path):
+    blocked = tmp_path / "cache"
+    blocked.write_text("not a directory")
+    cache = ParseCache(str(blocked))
+
+    cache.put("ab12", elements("data/1/fund.pdf"))
+
+    assert cache.get("ab12", "data/1/fund.pdf") is None
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = ParseCache(str(tmp_path / "cache"), max_bytes=10**9)
+    for key in ("aa01", "bb02", "cc03"):
+        cache.put(key, elements("data/1/fund.pdf"))
+    for mtime, key in enumerate(("aa01", "bb02", "cc03"), start=1):
+        os.utime(cache._path(key), (mtime, mtime))
+    cache.get("aa01", "data/1/fund.pdf")  # a hit makes aa01 the most recently used
+
+    entry_size = os.path.getsize(cache._path("aa01"))
+    cache.max_bytes = entry_size * 2 + entry_size // 2
+    cache.put("dd04", elements("data/1/fund.pdf"))
+
+    assert [cache.contains(key) for key in ("aa01", "bb02", "cc03", "dd04")] == [True, False, False, True]
+
+
+def test_overwriting_an_entry_does_not_grow_the_tracked_size(tmp_path):
+    cache = ParseCache(str(tmp_path / "cache"))
+    cache.put("aa01", elements("data/1/fund.pdf"))
+    cache.put("bb02", elements("data/1/fund.pdf"))
+    for _ in range(5):
+        cache.put("bb02", elements("data/1/fund.pdf", count=2))
+
+    assert cache._size == cache._scan()[1]
+
+
+def test_hit_on_an_entry_evicted_after_reading_still_returns_it(tmp_path, monkeypatch):
+    cache = ParseCache(str(tmp_path / "cache"))
+    cache.put("ab12", elements("data/1/fund.pdf"))
+
+    def evicted(path, *args):
+        os.remove(path)
+        raise FileNotFoundError(path)
+
+    monkeypatch.setattr(os, "utime", evicted)
+    assert len(cache.get("ab12", "data/2/copy.pdf")) == 3
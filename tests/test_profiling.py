@@ -0,0 +1,46 @@
+import threading
+import tracemalloc
+import profiling
+
+
+def test_stages_on_different_threads_do_not_stop_each_others_tracing(tmp_path, monkeypatch):
+    monkeypatch.setattr(profiling, "ENABLED", True)
+    monkeypatch.setattr(profiling, "SAMPLE_RATE", 1.0)
+    monkeypatch.setattr(profiling, "PROFILE_DIRECTORY", str(tmp_path))
+    worker_started, main_finished = threading.Event(), threading.Event()
+    errors = []
+
+    def worker():
+        try:
+            with profiling.stage("parse", "activity-2"):
+                worker_started.set()
+                main_finished.wait(5)
+                assert tracemalloc.is_tracing()
+        except Exception as e:
+            errors.append(e)
+
+    thread = threading.Thread(target=worker)
+    with profiling.stage("download", "activity-1"):
+        thread.start()
+        worker_started.wait(5)
+    main_finished.set()
+    thread.join()
+
+    assert errors == []
+    assert not tracemalloc.is_tracing()
+    assert list((tmp_path / "activity-1").glob("*_download.txt"))
+    assert list((tmp_path / "activity-2").glob("*_parse.txt"))
+
+
+def test_report_failures_do_not_reach_profiled_code(monkeypatch):
+    monkeypatch.setattr(profiling, "ENABLED", True)
+    monkeypatch.setattr(profiling, "SAMPLE_RATE", 1.0)
+
+    def broken_report(*args):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(profiling, "_write_report", broken_report)
+    with profiling.stage("parse", "activity-3"):
+        value = 42
+    assert value == 42
+    assert not tracemalloc.is_tracing()
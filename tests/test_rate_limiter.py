@@ -0,0 +1,177 @@
+import json
+import time
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import httpx
+import pytest
+from rate_limiter import RateLimiter, RateLimitedTransport, AsyncRateLimitedTransport, crew_llm
+
+
+class FakeOpenAI:
+    """Local stand-in for the OpenAI API that enforces request and token limits per window.
+
+    Over-limit requests get a 429 with retry-after-ms; every response carries
+    x-ratelimit-* headers describing the remaining budget.
+    """
+
+    def __init__(self, requests_per_window, tokens_per_window, window=0.5, latency=0.02):
+        self.requests_per_window = requests_per_window
+        self.tokens_per_window = tokens_per_window
+        self.window = window
+        self.latency = latency
+        self.accepted = []  # (time, tokens)
+        self.rejected = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+
+    def _usage(self, now):
+        recent = [(at, tokens) for at, tokens in self.accepted if now - at < self.window]
+        return recent, len(recent), sum(tokens for _, tokens in recent)
+
+    def handler(self, request):
+        tokens = len(json.dumps(json.loads(request.content)["input"])) // 4
+        with self._lock:
+            now = time.monotonic()
+            recent, used_requests, used_tokens = self._usage(now)
+            reset = (recent[0][0] + self.window - now) if recent else 0.0
+            if used_requests + 1 > self.requests_per_window or used_tokens + tokens > self.tokens_per_window:
+                self.rejected += 1
+                return httpx.Response(429, headers={
+                    "retry-after-ms": str(int(max(reset, 0.01) * 1000)),
+                    "x-ratelimit-remaining-requests": str(max(0, self.requests_per_window - used_requests)),
+                    "x-ratelimit-remaining-tokens": str(max(0, self.tokens_per_window - used_tokens)),
+                    "x-ratelimit-reset-requests": f"{int(reset * 1000)}ms",
+                }, json={"error": {"message": "Rate limit reached"}})
+            self.accepted.append((now, tokens))
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        time.sleep(self.latency)
+        with self._lock:
+            self.in_flight -= 1
+        return httpx.Response(200, headers={
+            "x-ratelimit-remaining-requests": str(self.requests_per_window - used_requests - 1),
+            "x-ratelimit-remaining-tokens": str(self.tokens_per_window - used_tokens - tokens),
+        }, json={"data": [{"embedding": [0.0]}]})
+
+    def max_usage_per_window(self):
+        """Most requests and tokens accepted in any window"""
+        peak_requests = peak_tokens = 0
+        for start, _ in self.accepted:
+            window = [tokens for at, tokens in self.accepted if start <= at < start + self.window]
+            peak_requests = max(peak_requests, len(window))
+            peak_tokens = max(peak_tokens, sum(window))
+        return peak_requests, peak_tokens
+
+
+def embed_all(fake, limiter, bodies, threads=8):
+    client = httpx.Client(
+        base_url="http://fake-openai.local/v1",
+        transport=RateLimitedTransport(limiter, httpx.MockTransport(fake.handler), max_retries=20)
+    )
+    with ThreadPoolExecutor(threads) as pool:
+        return list(pool.map(lambda body: client.post("/embeddings", json=body).status_code, bodies))
+
+
+def test_request_limit_is_respected_and_every_call_recovers():
+    # The fake allows 10 requests/s while the limiter is configured for 20/s, so it must adapt
+    fake = FakeOpenAI(requests_per_window=5, tokens_per_window=10**6)
+    limiter = RateLimiter(requests_per_minute=1200, tokens_per_minute=10**7, max_concurrency=8)
+
+    statuses = embed_all(fake, limiter, [{"input": f"chunk {i}"} for i in range(30)])
+
+    assert statuses == [200] * 30
+    assert fake.max_usage_per_window()[0] <= 5
+    assert fake.rejected < 30
+    assert limiter.concurrency_limit < limiter.max_concurrency
+
+
+def test_token_limit_is_respected():
+    fake = FakeOpenAI(requests_per_window=100, tokens_per_window=1000)
+    limiter = RateLimiter(requests_per_minute=6000, tokens_per_minute=240000, max_concurrency=8)
+    body = {"input": ["x" * 1200]}  # about 300 tokens per request
+
+    statuses = embed_all(fake, limiter, [body] * 12)
+
+    assert statuses == [200] * 12
+    assert fake.max_usage_per_window()[1] <= 1000
+
+
+def test_concurrency_backs_off_on_429_and_recovers():
+    limiter = RateLimiter(requests_per_minute=6000, tokens_per_minute=10**6, max_concurrency=8)
+    limiter.acquire()
+    limiter.release(429, {"retry-after-ms": "10"})
+    assert limiter.concurrency_limit == 4
+
+    for _ in range(40):
+        limiter.acquire()
+        limiter.release(200, {})
+    assert limiter.concurrency_limit == 8
+
+
+def test_remaining_budget_headers_tighten_the_limiter():
+    limiter = RateLimiter(requests_per_minute=600, tokens_per_minute=10**6, max_concurrency=8)
+    limiter.acquire()
+    limiter.release(200, {"x-ratelimit-remaining-requests": "0"})
+
+    started = time.monotonic()
+    limiter.acquire()
+    limiter.release(200, {})
+    assert time.monotonic() - started >= 0.08  # one request slot refills every 0.1s at 600 rpm
+
+
+class CountingLimiter(RateLimiter):
+    def __init__(self):
+        super().__init__(requests_per_minute=6000, tokens_per_minute=10**7, max_concurrency=8)
+        self.acquired = 0
+
+    def acquire(self, tokens=1):
+        super().acquire(tokens)
+        self.acquired += 1
+
+
+CHAT_COMPLETION = {
+    "id": "chatcmpl-1", "object": "chat.completion", "created": 0, "model": "gpt-4o-mini",
+    "choices": [{"index": 0, "message": {"role": "assistant", "content": "ok"}, "finish_reason": "stop"}],
+    "usage": {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2},
+}
+
+
+@pytest.fixture
+def limited_clients(monkeypatch):
+    """Route the shared clients to an in-process fake through a counting limiter"""
+    import rate_limiter
+    pytest.importorskip("crewai")
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    limiter = CountingLimiter()
+    handler = lambda request: httpx.Response(200, json=CHAT_COMPLETION)
+    monkeypatch.setattr(rate_limiter, "_limiter", limiter)
+    monkeypatch.setattr(rate_limiter, "_http_client", httpx.Client(
+        transport=RateLimitedTransport(limiter, httpx.MockTransport(handler))))
+    monkeypatch.setattr(rate_limiter, "async_http_client", lambda: httpx.AsyncClient(
+        transport=AsyncRateLimitedTransport(limiter, httpx.MockTransport(handler))))
+    return limiter
+
+
+def test_crew_llm_sync_and_async_calls_go_through_the_limiter(limited_clients):
+    llm = crew_llm()
+    assert llm.call("Say ok") == "ok"
+    assert asyncio.run(llm.acall("Say ok")) == "ok"
+    assert limited_clients.acquired == 2
+
+
+def test_crew_agents_use_the_rate_limited_llm(limited_clients, monkeypatch):
+    import crewai
+    import chroma_store
+    from step1_crew import run_crew_step1
+    captured = []
+    monkeypatch.setattr(chroma_store, "get_vector_store", lambda name: None)
+    monkeypatch.setattr(crewai.Crew, "kickoff", lambda crew, *args, **kwargs: captured.extend(crew.agents))
+
+    run_crew_step1("1863")
+
+    assert captured
+    for agent in captured:
+        assert agent.llm.call("Say ok") == "ok"
+    assert limited_clients.acquired == len(captured)
@@ -0,0 +1,51 @@
+import threading
+import pytest
+from scheduler import Scheduler
+
+
+def run_in_order(scheduler, jobs):
+    """Hold the single worker busy while jobs are queued, then return the order they ran in"""
+    order, gate = [], threading.Event()
+    blocker = scheduler.submit(gate.wait, cost=0.1, activity_id="blocker")
+    futures = [
+        scheduler.submit(order.append, name, cost=cost, activity_id=activity)
+        for name, cost, activity in jobs
+    ]
+    gate.set()
+    for future in [blocker, *futures]:
+        future.result(timeout=5)
+    return order
+
+
+def test_sjf_runs_the_cheapest_activity_first():
+    scheduler = Scheduler(workers=1, policy="sjf")
+    order = run_in_order(scheduler, [("big", 50, "a"), ("small", 1, "b"), ("medium", 10, "c")])
+    scheduler.shutdown()
+    assert order == ["small", "medium", "big"]
+
+
+def test_finished_work_no_longer_counts_against_an_activity():
+    scheduler = Scheduler(workers=1, policy="sjf")
+    scheduler.submit(lambda: None, cost=100, activity_id="a").result(timeout=5)
+    order = run_in_order(scheduler, [("b-doc", 10, "b"), ("a-late-doc", 1, "a")])
+    scheduler.shutdown()
+    assert order == ["a-late-doc", "b-doc"]
+
+
+def test_fifo_keeps_submission_order():
+    scheduler = Scheduler(workers=1, policy="fifo")
+    order = run_in_order(scheduler, [("big", 50, "a"), ("small", 1, "b")])
+    scheduler.shutdown()
+    assert order == ["big", "small"]
+
+
+def test_job_exceptions_are_set_on_the_future():
+    scheduler = Scheduler(workers=1)
+
+    def fail():
+        raise ValueError("bad document")
+
+    with pytest.raises(ValueError, match="bad document"):
+        scheduler.submit(fail, activity_id="a").result(timeout=5)
+    assert scheduler.submit(lambda: "ok", activity_id="a").result(timeout=5) == "ok"
+    scheduler.shutdown()
@@ -0,0 +1,27 @@
+import os
+import time
+import pytest
+
+pytest.importorskip("langchain_chroma")
+import summaries
+
+
+def test_summary_cache_evicts_least_recently_used(tmp_path, monkeypatch):
+    monkeypatch.setattr(summaries, "CACHE_DIRECTORY", str(tmp_path))
+    for index, name in enumerate(["old.json", "used.json", "new.json"]):
+        (tmp_path / name).write_text("x" * 100)
+        os.utime(tmp_path / name, (time.time() - 100 + index, time.time() - 100 + index))
+    os.utime(tmp_path / "used.json")
+
+    summaries.evict_cache(max_bytes=200)
+
+    assert sorted(os.listdir(tmp_path)) == ["new.json", "used.json"]
+
+
+def test_unreadable_summaries_are_skipped(tmp_path, monkeypatch):
+    monkeypatch.setattr(summaries, "summary_directory", lambda activity: str(tmp_path))
+    (tmp_path / "good.pdf.json").write_text('{"source": "data/1/good.pdf", "digest": "- name: Fund", "sections": []}')
+    (tmp_path / "bad.pdf.json").write_text("{truncated")
+
+    assert [summary["source"] for summary in summaries.load_summaries("1")] == ["data/1/good.pdf"]
+    assert "good.pdf" in summaries.format_summaries("1")
@@ -0,0 +1,53 @@
+import os
+import pytest
+
+pytest.importorskip("pypdf")
+pytest.importorskip("pdfplumber")
+vector_store = pytest.importorskip("vector_store")
+
+SAMPLE_PDF = os.path.join(os.path.dirname(__file__), "data", "monthly_returns.pdf")
+MONTHS = ["Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"]
+
+
+def test_numeric_rows_mark_a_page_as_holding_a_table():
+    grid = "\n".join(["2023 1.2 -0.4 0.85 1.1 -1.25 0.6 0.95"] * 3)
+    assert vector_store.has_numeric_table(f"Monthly returns\n{grid}")
+    assert not vector_store.has_numeric_table("The fund was launched in 2015 with 3 share classes.")
+
+
+def test_text_page_with_a_table_is_partitioned_hi_res():
+    assert vector_store.detect_page_strategies(SAMPLE_PDF) == [vector_store.TABLE_STRATEGY]
+
+
+@pytest.fixture
+def hi_res_models():
+    """Skip when the layout model or the tokenizer cannot be downloaded"""
+    pytest.importorskip("unstructured_inference")
+    import tiktoken
+    from unstructured_inference.models.base import get_model
+    try:
+        get_model()
+        tiktoken.get_encoding("cl100k_base")
+    except Exception as e:
+        pytest.skip(f"hi-res models unavailable: {e}")
+
+
+def test_table_reaches_the_splitter_as_one_element(hi_res_models):
+    elements = vector_store.parse_file(SAMPLE_PDF)
+    tables = [doc for doc in elements if doc.metadata.get("category") == "Table"]
+    assert len(tables) == 1
+    assert tables[0].metadata.get("text_as_html")
+
+    chunks = vector_store.split_documents(elements)
+    table_chunks = [chunk for chunk in chunks if chunk.metadata["element_type"] == "Table"]
+    assert len(table_chunks) == 1
+    assert all(month in table_chunks[0].page_content for month in MONTHS)
+    assert all(year in table_chunks[0].page_content for year in ("2021", "2022", "2023"))
+
+
+def test_parse_workers_share_one_spawned_pool():
+    pool = vector_store.parse_pool()
+    assert pool is vector_store.parse_pool()
+    assert pool._mp_context.get_start_method() == "spawn"
+    grid = "\n".join(["2023 1.2 -0.4 0.85 1.1 -1.25 0.6 0.95"] * 3)
+    assert pool.submit(vector_store.has_numeric_table, grid).result(timeout=300)
@@ -0,0 +1,66 @@
+import pytest
+import tiktoken
+from langchain_core.documents import Document
+from text_splitting import TableAwareSplitter
+
+
+class WordEncoding:
+    """Stand-in tokenizer (one token per word) so tests do not download tiktoken encodings"""
+    name = "words"
+
+    def encode(self, text, allowed_special=(), disallowed_special=()):
+        return text.split()
+
+    def decode(self, tokens):
+        return " ".join(tokens)
+
+
+@pytest.fixture
+def splitter(monkeypatch):
+    monkeypatch.setattr(tiktoken, "get_encoding", lambda name: WordEncoding())
+    return TableAwareSplitter(chunk_tokens=40, chunk_overlap_tokens=0, max_table_tokens=80)
+
+
+def element(text, category="NarrativeText", page=1, **metadata):
+    return Document(page_content=text, metadata={"source": "fund.pdf", "page_number": page, "category": category, **metadata})
+
+
+def test_narrative_on_the_same_page_is_joined(splitter):
+    chunks = splitter.split_documents([element("Fund overview."), element("Launched in 2015.")])
+    assert [chunk.page_content for chunk in chunks] == ["Fund overview.\n\nLaunched in 2015."]
+    assert chunks[0].metadata["element_type"] == "Text"
+    assert "category" not in chunks[0].metadata
+
+
+def test_table_is_kept_whole_and_separate_from_text(splitter):
+    table_html = (
+        "<table><tr><th>Year</th><th>Jan</th><th>Feb</th></tr>"
+        "<tr><td>2023</td><td>1.2</td><td>-0.4</td></tr></table>"
+    )
+    chunks = splitter.split_documents([
+        element("Monthly returns"),
+        element("Year Jan Feb 2023 1.2 -0.4", category="Table", text_as_html=table_html),
+        element("Past performance is no guide."),
+    ])
+    assert [chunk.metadata["element_type"] for chunk in chunks] == ["Text", "Table", "Text"]
+    assert chunks[1].page_content == "Year | Jan | Feb\n2023 | 1.2 | -0.4"
+    assert "text_as_html" not in chunks[1].metadata
+
+
+def test_large_table_is_split_into_row_groups_repeating_the_header(splitter):
+    header = "Year Jan Feb Mar Apr May Jun Jul Aug Sep Oct Nov Dec"
+    rows = [f"{year} " + " ".join(["0.5"] * 12) for year in range(2010, 2024)]
+    chunks = splitter.split_documents([element("\n".join([header, *rows]), category="Table")])
+    assert len(chunks) > 1
+    assert all(chunk.page_content.startswith(header + "\n") for chunk in chunks)
+    assert all(chunk.metadata["table_parts"] == len(chunks) for chunk in chunks)
+    assert sum(len(chunk.page_content.split("\n")) - 1 for chunk in chunks) == len(rows)
+
+
+def test_row_groups_are_sized_by_the_table_limit(splitter):
+    header = "Year Jan Feb Mar Apr May Jun Jul Aug Sep Oct Nov Dec"
+    rows = [f"{year} " + " ".join(["0.5"] * 12) for year in range(2018, 2024)]
+    # 12 + 6 * 13 = 90 tokens: just over max_table_tokens=80, so two parts rather than chunk_tokens-sized ones
+    chunks = splitter.split_documents([element("\n".join([header, *rows]), category="Table")])
+    assert len(chunks) == 2
+    assert all(len(chunk.page_content.split()) <= splitter.max_table_tokens for chunk in chunks)
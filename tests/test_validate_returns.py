@@ -0,0 +1,52 @@
+import calendar
+from step6_crew import validate_returns
+
+
+def month_end(year, month):
+    return f"{year}-{month:02d}-{calendar.monthrange(year, month)[1]:02d}T00:00:00Z"
+
+
+def series(year, values):
+    return [{"valuationDate": month_end(year, month), "rorValue": value} for month, value in enumerate(values, start=1)]
+
+
+def compounded(values):
+    total = 1.0
+    for value in values:
+        total *= 1 + value / 100
+    return (total - 1) * 100
+
+
+def test_clean_series_has_no_issues():
+    values = [1.0, -0.5, 0.8, 1.2, -1.1, 0.4, 0.9, -0.2, 0.3, 1.0, 0.6, 0.1]
+    records = series(2022, values) + series(2023, values)
+    assert validate_returns(records, {2022: round(compounded(values), 2), 2023: round(compounded(values), 2)}) == {}
+    assert validate_returns([]) == {}
+
+
+def test_dates_that_are_not_month_ends_are_flagged():
+    records = series(2023, [1.0] * 12)
+    records[3]["valuationDate"] = "2023-04-15T00:00:00Z"
+    assert validate_returns(records) == {2023: ["valuation date is not a month end"]}
+
+
+def test_duplicated_and_missing_months_are_flagged_by_year():
+    records = series(2022, [1.0] * 12) + series(2023, [1.0] * 12)
+    records.append(dict(records[0]))
+    del records[15]  # 2023-04
+    issues = validate_returns(records)
+    assert issues == {2022: ["duplicated month"], 2023: ["missing month"]}
+
+
+def test_years_that_do_not_compound_to_the_reported_ytd_are_flagged():
+    values = [1.0] * 12
+    records = series(2022, values) + series(2023, values)
+    issues = validate_returns(records, {2022: compounded(values) + 0.1, 2023: compounded(values) + 2.0, 2019: 5.0})
+    assert issues == {2023: ["monthly values do not compound to the reported YTD"]}
+
+
+def test_impossible_dates_are_flagged_instead_of_raising():
+    records = series(2022, [1.0] * 12) + series(2023, [1.0] * 12)
+    records[13]["valuationDate"] = "2023-02-29T00:00:00Z"
+    assert validate_returns(records) == {2023: ["unparseable valuation date", "missing month"]}
+    assert validate_returns([{"valuationDate": "2023-02-29T00:00:00Z", "rorValue": 1.0}]) == {2023: ["unparseable valuation date"]}
@@ -0,0 +1,75 @@
+import requests
+from write_behind import WriteBehindBuffer
+
+
+def http_error(status_code):
+    response = requests.Response()
+    response.status_code = status_code
+    return requests.HTTPError(f"{status_code} error", response=response)
+
+
+class FakeClient:
+    """Records every post; fails according to a callable deciding per batch"""
+
+    def __init__(self, fail=lambda batch, call: None):
+        self.fail = fail
+        self.calls = []
+
+    def post_request(self, endpoint, payload):
+        self.calls.append(list(payload))
+        error = self.fail(payload, len(self.calls))
+        if error:
+            raise error
+        return {"inserted": len(payload)}
+
+
+def buffer(client, **kwargs):
+    return WriteBehindBuffer(client, "/GenAI/InsertDocKeyValues", max_records=1000, max_delay=60, retry_backoff=0, **kwargs)
+
+
+def test_rejected_records_are_isolated_by_splitting():
+    client = FakeClient(lambda batch, call: http_error(400) if {"id": 5} in batch else None)
+    writer = buffer(client)
+    writer.add([{"id": index} for index in range(8)])
+    outcomes = writer.close()
+    assert [outcome["record"]["id"] for outcome in outcomes if not outcome["ok"]] == [5]
+    assert sum(outcome["ok"] for outcome in outcomes) == 7
+
+
+def test_auth_failures_fail_the_whole_batch_once():
+    for status_code in (401, 403):
+        client = FakeClient(lambda batch, call: http_error(status_code))
+        writer = buffer(client, max_retries=3)
+        writer.add([{"id": index} for index in range(100)])
+        outcomes = writer.close()
+        assert [len(call) for call in client.calls] == [100]
+        assert not any(outcome["ok"] for outcome in outcomes)
+
+
+def test_outage_retries_the_whole_batch_without_splitting():
+    client = FakeClient(lambda batch, call: requests.ConnectionError("connection refused"))
+    writer = buffer(client, max_retries=3)
+    writer.add([{"id": index} for index in range(100)])
+    outcomes = writer.close()
+    assert len(client.calls) == 4
+    assert all(len(call) == 100 for call in client.calls)
+    assert not any(outcome["ok"] for outcome in outcomes)
+
+
+def test_transient_errors_recover_on_retry():
+    client = FakeClient(lambda batch, call: http_error(503) if call < 3 else None)
+    writer = buffer(client, max_retries=3)
+    writer.add([{"id": index} for index in range(10)])
+    outcomes = writer.close()
+    assert len(client.calls) == 3
+    assert all(outcome["ok"] for outcome in outcomes)
+
+
+def test_size_threshold_flushes_a_batch():
+    client = FakeClient()
+    writer = WriteBehindBuffer(client, "/GenAI/InsertStepResult", max_records=3, max_delay=60)
+    writer.add([{"id": 1}, {"id": 2}])
+    assert client.calls == []
+    writer.add({"id": 3})
+    assert client.calls == [[{"id": 1}, {"id": 2}, {"id": 3}]]
+    writer.close()
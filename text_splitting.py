@@ -0,0 +1,101 @@
+import re
+import html
+import tiktoken
+from langchain_core.documents import Document
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+# Element metadata too large or too noisy to store with every chunk
+DROPPED_METADATA = ("text_as_html", "orig_elements", "coordinates", "element_id", "parent_id", "category")
+
+
+class TableAwareSplitter:
+    """Split unstructured elements into token-sized chunks without cutting tables apart.
+
+    Consecutive non-table elements from the same source and page are joined
+    and split by tokens. Table elements are kept whole when they fit in
+    max_table_tokens; larger tables are split into row groups, each repeating
+    the header row. Every chunk is tagged with element_type.
+    """
+
+    def __init__(self, chunk_tokens=400, chunk_overlap_tokens=50, max_table_tokens=800, encoding_name="cl100k_base"):
+        self.chunk_tokens = chunk_tokens
+        self.max_table_tokens = max_table_tokens
+        self.encoding = tiktoken.get_encoding(encoding_name)
+        self.text_splitter = RecursiveCharacterTextSplitter.from_tiktoken_encoder(
+            encoding_name=encoding_name,
+            chunk_size=chunk_tokens,
+            chunk_overlap=chunk_overlap_tokens
+        )
+
+    def _tokens(self, text):
+        return len(self.encoding.encode(text, disallowed_special=()))
+
+    @staticmethod
+    def _metadata(metadata, element_type):
+        metadata = {key: value for key, value in metadata.items() if key not in DROPPED_METADATA}
+        metadata["element_type"] = element_type
+        return metadata
+
+    @staticmethod
+    def _table_rows(doc):
+        """Table rows as text, from the HTML rendering when hi-res inference produced one"""
+        table_html = doc.metadata.get("text_as_html")
+        if table_html:
+            rows = []
+            for row in re.findall(r"<tr[^>]*>(.*?)</tr>", table_html, flags=re.S | re.I):
+                cells = re.findall(r"<t[dh][^>]*>(.*?)</t[dh]>", row, flags=re.S | re.I)
+                rows.append(" | ".join(html.unescape(re.sub(r"<[^>]+>", "", cell)).strip() for cell in cells))
+            if rows:
+                return rows
+        return [line for line in doc.page_content.split("\n") if line.strip()]
+
+    def _split_table(self, doc):
+        metadata = self._metadata(doc.metadata, "Table")
+        table_rows = self._table_rows(doc)
+        # One line per row keeps the grid readable when hi-res inference flattened the cell text
+        text = "\n".join(table_rows) if doc.metadata.get("text_as_html") else doc.page_content
+        if self._tokens(text) <= self.max_table_tokens:
+            return [Document(page_content=text, metadata=metadata)]
+        header, *rows = table_rows or [text]
+        if not rows:
+            return [Document(page_content=chunk, metadata=dict(metadata)) for chunk in self.text_splitter.split_text(text)]
+        # Each part, header included, may be as large as a table kept whole
+        budget = self.max_table_tokens - self._tokens(header)
+        groups, current, used = [], [], 0
+        for row in rows:
+            row_tokens = self._tokens(row)
+            if current and used + row_tokens > budget:
+                groups.append(current)
+                current, used = [], 0
+            current.append(row)
+            used += row_tokens
+        if current:
+            groups.append(current)
+        return [
+            Document(
+                page_content="\n".join([header, *group]),
+                metadata={**metadata, "table_part": index, "table_parts": len(groups)}
+            )
+            for index, group in enumerate(groups, start=1)
+        ]
+
+    def _split_text(self, docs):
+        text = "\n\n".join(doc.page_content for doc in docs)
+        metadata = self._metadata(docs[0].metadata, "Text")
+        return [Document(page_content=chunk, metadata=dict(metadata)) for chunk in self.text_splitter.split_text(text)]
+
+    def split_documents(self, documents):
+        chunks, pending = [], []
+        for doc in documents:
+            is_table = doc.metadata.get("category") == "Table"
+            key = (doc.metadata.get("source"), doc.metadata.get("page_number"))
+            if pending and (is_table or key != (pending[0].metadata.get("source"), pending[0].metadata.get("page_number"))):
+                chunks.extend(self._split_text(pending))
+                pending = []
+            if is_table:
+                chunks.extend(self._split_table(doc))
+            elif doc.page_content.strip():
+                pending.append(doc)
+        if pending:
+            chunks.extend(self._split_text(pending))
+        return chunks
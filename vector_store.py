@@ -1,69 +1,325 @@
 import os
+import re
 from dotenv import load_dotenv
 import glob
+import tempfile
+import threading
+import multiprocessing
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
 from langchain_community.document_loaders import UnstructuredFileLoader
-from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain_openai import OpenAIEmbeddings
-from langchain_chroma import Chroma
+from langchain_community.vectorstores.utils import filter_complex_metadata
+from text_splitting import TableAwareSplitter
+from chroma_store import add_documents, get_vector_store, BACKEND, LAYOUT
+from profiling import stage
+import parse_cache
+import summaries
 
 load_dotenv()
 # Set the base directory where your client folders are located
 base_folder = "data"
-# Define the list of client folders
-client_folders = [
-    client for client in os.listdir(base_folder)
-    if os.path.isdir(os.path.join(base_folder, client)) and not client.startswith('.')
-]
 
-# Set the base directory where your client folders are located
-base_folder = "data"
-# Instantiate the embeddings model
-embedding = OpenAIEmbeddings(openai_api_key=os.getenv("OPENAI_API_KEY"))
+# Pages whose text layer has at least this many characters are parsed on the fast
+# text path; image-only (scanned) pages are reserved for hi-res layout/OCR inference
+MIN_TEXT_CHARS_PER_PAGE = 50
+TEXT_STRATEGY = "fast"
+IMAGE_STRATEGY = "hi_res"
+
+# Text pages holding a table also go through hi-res layout inference with table
+# structure inference, since the fast path never emits Table elements. A page holds
+# a table when pdfplumber finds a ruled one, or when MIN_NUMERIC_ROWS of its lines
+# carry at least MIN_NUMERIC_CELLS numbers (unruled monthly-return grids)
+TABLE_STRATEGY = "hi_res"
+INFER_TABLE_STRUCTURE = True
+MIN_NUMERIC_CELLS = 6
+MIN_NUMERIC_ROWS = 3
+NUMERIC_CELL = re.compile(r"(?<![\w.])[-+(]?\d+(?:[.,]\d+)?%?\)?(?![\w.])")
+
+# PDFs longer than LARGE_PDF_PAGES are split into page ranges of at most
+# PAGES_PER_RANGE pages and parsed in parallel worker processes
+LARGE_PDF_PAGES = 50
+PAGES_PER_RANGE = 25
+PARSE_WORKERS = int(os.getenv("PARSE_WORKERS", os.cpu_count() or 1))
+# One pool is shared by every ingestion worker, so at most PARSE_WORKERS processes hold
+# the hi-res models. Workers are spawned: forking a process that is already running
+# ingestion, write-behind and scheduler threads can deadlock the child.
+_parse_pool = None
+_parse_pool_lock = threading.Lock()
+
+# Chunk sizes in tokens; tables up to MAX_TABLE_TOKENS stay in one chunk
+CHUNK_TOKENS = 400
+CHUNK_OVERLAP_TOKENS = 50
+MAX_TABLE_TOKENS = 800
+
+# Bump LOADER_VERSION whenever load_file's output changes, so cached parses are not reused
+LOADER_VERSION = 2
+file_parse_cache = parse_cache.ParseCache()
+
+# Serialises writes to the same activity collection when documents are ingested concurrently
+_activity_locks = defaultdict(threading.Lock)
+
+
+def parser_version():
+    from unstructured.__version__ import __version__ as unstructured_version
+    return (
+        f"loader-{LOADER_VERSION}/unstructured-{unstructured_version}/"
+        f"{TEXT_STRATEGY}-{IMAGE_STRATEGY}-{MIN_TEXT_CHARS_PER_PAGE}/"
+        f"tables-{TABLE_STRATEGY}-{INFER_TABLE_STRUCTURE}-{MIN_NUMERIC_CELLS}x{MIN_NUMERIC_ROWS}"
+    )
+
+
+def has_numeric_table(text):
+    """True when enough lines of a page's text look like rows of a numeric table"""
+    rows = sum(len(NUMERIC_CELL.findall(line)) >= MIN_NUMERIC_CELLS for line in text.splitlines())
+    return rows >= MIN_NUMERIC_ROWS
+
+
+def detect_table_pages(file_path, page_numbers):
+    """1-based numbers, among page_numbers, of pages where pdfplumber finds a ruled table"""
+    if not page_numbers:
+        return set()
+    try:
+        import pdfplumber
+        with pdfplumber.open(file_path) as pdf:
+            return {number for number in page_numbers if pdf.pages[number - 1].find_tables()}
+    except Exception as e:
+        print(f"  table detection skipped for {file_path}: {e}")
+        return set()
+
+
+def detect_page_strategies(file_path):
+    """Return the partition strategy to use for each page of a PDF"""
+    from pypdf import PdfReader
+    texts = []
+    for page in PdfReader(file_path).pages:
+        try:
+            texts.append(page.extract_text() or "")
+        except Exception:
+            texts.append("")
+    text_pages = [
+        number for number, text in enumerate(texts, start=1)
+        if len(text.strip()) >= MIN_TEXT_CHARS_PER_PAGE and not has_numeric_table(text)
+    ]
+    table_pages = detect_table_pages(file_path, text_pages)
+    strategies = []
+    for number, text in enumerate(texts, start=1):
+        if len(text.strip()) < MIN_TEXT_CHARS_PER_PAGE:
+            strategies.append(IMAGE_STRATEGY)
+        elif has_numeric_table(text) or number in table_pages:
+            strategies.append(TABLE_STRATEGY)
+        else:
+            strategies.append(TEXT_STRATEGY)
+    return strategies
+
+
+def group_page_runs(strategies):
+    """Group consecutive pages sharing a strategy into (first_page, last_page, strategy) runs"""
+    runs = []
+    for page_number, strategy in enumerate(strategies, start=1):
+        if runs and runs[-1][2] == strategy:
+            runs[-1] = (runs[-1][0], page_number, strategy)
+        else:
+            runs.append((page_number, page_number, strategy))
+    return runs
+
+
+def split_page_runs(runs, max_pages):
+    """Split (first_page, last_page, strategy) runs into ranges of at most max_pages pages"""
+    ranges = []
+    for first_page, last_page, strategy in runs:
+        for start in range(first_page, last_page + 1, max_pages):
+            ranges.append((start, min(start + max_pages - 1, last_page), strategy))
+    return ranges
+
+
+def partition_page_range(file_path, first_page, last_page, strategy, page_count):
+    """Partition pages first_page..last_page (1-based, inclusive) of a PDF with one strategy"""
+    options = {"infer_table_structure": INFER_TABLE_STRUCTURE} if strategy == "hi_res" else {}
+    if first_page == 1 and last_page == page_count:
+        docs = UnstructuredFileLoader(file_path, mode="elements", strategy=strategy, **options).load()
+    else:
+        from pypdf import PdfReader, PdfWriter
+        reader = PdfReader(file_path)
+        writer = PdfWriter()
+        for index in range(first_page - 1, last_page):
+            writer.add_page(reader.pages[index])
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            range_path = os.path.join(tmp_dir, os.path.basename(file_path))
+            with open(range_path, "wb") as range_file:
+                writer.write(range_file)
+            docs = UnstructuredFileLoader(range_path, mode="elements", strategy=strategy, **options).load()
+
+    for doc in docs:
+        doc.metadata["source"] = file_path
+        doc.metadata["file_directory"] = os.path.dirname(file_path)
+        doc.metadata["page_number"] = first_page + doc.metadata.get("page_number", 1) - 1
+        doc.metadata["partition_strategy"] = strategy
+    return docs
+
+
+def parse_pool():
+    global _parse_pool
+    with _parse_pool_lock:
+        if _parse_pool is None:
+            _parse_pool = ProcessPoolExecutor(
+                max_workers=PARSE_WORKERS, mp_context=multiprocessing.get_context("spawn")
+            )
+        return _parse_pool
+
+
+def load_pdf(file_path):
+    """Load a PDF's elements, using OCR only on pages without a usable text layer"""
+    try:
+        strategies = detect_page_strategies(file_path)
+    except Exception as e:
+        # Encrypted or malformed PDFs that pypdf cannot read are left to unstructured's default strategy
+        print(f"  page analysis failed for {file_path} ({e}); parsing with the default strategy")
+        return UnstructuredFileLoader(file_path, mode="elements").load()
+    page_count = len(strategies)
+    runs = group_page_runs(strategies)
+    documents = []
+    if page_count > LARGE_PDF_PAGES and PARSE_WORKERS > 1:
+        # Parse page ranges in parallel; results are collected in page order
+        ranges = split_page_runs(runs, PAGES_PER_RANGE)
+        futures = [
+            parse_pool().submit(partition_page_range, file_path, first_page, last_page, strategy, page_count)
+            for first_page, last_page, strategy in ranges
+        ]
+        for future in futures:
+            documents.extend(future.result())
+    else:
+        for first_page, last_page, strategy in runs:
+            documents.extend(partition_page_range(file_path, first_page, last_page, strategy, page_count))
+    text_pages = strategies.count(TEXT_STRATEGY)
+    print(f"  {page_count} pages: {text_pages} {TEXT_STRATEGY}, {page_count - text_pages} hi_res (scanned or tables)")
+    return documents
+
+
+def parse_file(file_path):
+    """Parse a single file into one Document per unstructured element"""
+    if file_path.lower().endswith(".pdf"):
+        return load_pdf(file_path)
+    return UnstructuredFileLoader(file_path, mode="elements").load()
+
+
+def load_file(file_path):
+    """Parse a file, reusing cached elements for content that was parsed before"""
+    if not parse_cache.ENABLED:
+        return parse_file(file_path)
+    key = file_parse_cache.key(file_path, parser_version())
+    documents = file_parse_cache.get(key, file_path)
+    if documents is not None:
+        print(f"  parse cache hit ({len(documents)} elements)")
+        return documents
+    documents = parse_file(file_path)
+    file_parse_cache.put(key, documents)
+    return documents
+
+
+def summarize_file(activity, file_path, documents):
+    """Build the optional per-document summary; failures never block ingestion"""
+    if not summaries.ENABLED or not documents:
+        return
+    try:
+        with stage("summarize", activity):
+            summaries.summarize_document(activity, file_path, documents, parse_cache.file_hash(file_path))
+    except Exception as e:
+        print(f"Error summarising {file_path}: {e}")
+
+
+def split_documents(documents):
+    text_splitter = TableAwareSplitter(CHUNK_TOKENS, CHUNK_OVERLAP_TOKENS, MAX_TABLE_TOKENS)
+    return filter_complex_metadata(text_splitter.split_documents(documents))
+
+
+def ingest_document(activity, file_path=None, content=None, file_name=None):
+    """Parse, split and embed a single document into an activity's collection.
+
+    Pass either the path of a file on disk, or its decoded bytes as content
+    with a file_name (saved under data/<activity>/). Chunks previously stored
+    for the same source are replaced, so re-ingesting does not duplicate them.
+    Returns the number of chunks stored.
+    """
+    activity = str(activity)
+    if content is not None:
+        # Document names come from the API; keep only the final component so they stay under data/<activity>/
+        safe_name = os.path.basename(file_name.replace("\\", "/")) if file_name else ""
+        if safe_name in ("", ".", ".."):
+            raise ValueError(f"Invalid document name: {file_name!r}")
+        file_path = os.path.join(base_folder, activity, safe_name)
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        with open(file_path, "wb") as document_file:
+            document_file.write(content)
+
+    with stage("parse", activity):
+        documents = load_file(file_path)
+    summarize_file(activity, file_path, documents)
+    with stage("split", activity):
+        split_docs = split_documents(documents)
+    if not split_docs:
+        print(f"No content extracted from {file_path}")
+        return 0
+
+    with stage("embed_and_store", activity), _activity_locks[activity]:
+        store = get_vector_store(activity)
+        existing_ids = store.get(where={"source": file_path}, include=[])["ids"]
+        if existing_ids:
+            store.delete(ids=existing_ids)
+        add_documents(activity, split_docs)
+    print(f"Ingested {file_path}: {len(split_docs)} chunks into activity {activity}")
+    return len(split_docs)
 
-# Loop through each client folder
-for client in client_folders:
+
+def process_client(client):
     print(f"Processing client: {client}")
-    
+
     # Define the client folder path
     client_folder_path = os.path.join(base_folder, client)
-    
+
     # Get all PDF and XLSX files in this folder
     pdf_files = glob.glob(os.path.join(client_folder_path, "*.pdf"))
     xlsx_files = glob.glob(os.path.join(client_folder_path, "*.xlsx"))
     file_list = pdf_files + xlsx_files
-    
+
     # Initialize an empty list to hold documents
     documents = []
-    
+
     # Process each file individually
-    for file_path in file_list:
-        try:
-            # Use UnstructuredFileLoader to load the file
-            loader = UnstructuredFileLoader(file_path)
-            docs = loader.load()  # Returns list of Document objects
-            documents.extend(docs)
-            print(f"Loaded file: {file_path}")
-        except Exception as e:
-            print(f"Error loading {file_path}: {e}")
-    
+    with stage("parse", client):
+        for file_path in file_list:
+            try:
+                docs = load_file(file_path)  # Returns list of Document objects
+                documents.extend(docs)
+                print(f"Loaded file: {file_path}")
+            except Exception as e:
+                print(f"Error loading {file_path}: {e}")
+                continue
+            summarize_file(client, file_path, docs)
+
     if not documents:
         print(f"No documents found for {client}. Moving to next folder.")
-        continue
-
-    # Split documents into chunks
-    text_splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=200)
-    split_docs = text_splitter.split_documents(documents)
-    
-    # Define persistence directory for this client's Chroma collection
-    persist_directory = os.path.join("chroma_db", client)
-    
-    # Create and persist the Chroma vector store
-    vector_db = Chroma.from_documents(
-        documents=split_docs,
-        embedding=embedding,
-        persist_directory=persist_directory
-    )
-    
-    print(f"Client {client} processed and stored in Chroma vector store at: {persist_directory}\n")
+        return
+
+    # Split elements into token-sized chunks, keeping tables intact
+    with stage("split", client):
+        split_docs = split_documents(documents)
+
+    # Embed and persist the chunks in the configured vector store layout
+    with stage("embed_and_store", client):
+        add_documents(client, split_docs)
+
+    print(f"Client {client} processed and stored in vector store ({BACKEND} backend, {LAYOUT} layout)\n")
+
+
+if __name__ == "__main__":
+    # Define the list of client folders
+    client_folders = [
+        client for client in os.listdir(base_folder)
+        if os.path.isdir(os.path.join(base_folder, client)) and not client.startswith('.')
+    ]
+
+    # Loop through each client folder
+    for client in client_folders:
+        process_client(client)
 
-print("All client folders have been processed.")
\ No newline at end of file
+    print("All client folders have been processed.")
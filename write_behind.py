@@ -0,0 +1,111 @@
+import atexit
+import threading
+import time
+
+
+class WriteBehindBuffer:
+    """Coalesces records for a list-shaped AES API endpoint into batched payloads.
+
+    Records are queued with add() and posted together when max_records are
+    pending, when the oldest pending record is max_delay seconds old, or at
+    close()/interpreter shutdown. Every record gets an outcome dict
+    ({"record", "ok", "response" | "error"}) collected in self.outcomes.
+
+    A batch the API rejects as invalid (400/422) is split in halves to isolate
+    the rejected records. Other 4xx responses (401/403 auth failures, 404, ...)
+    fail the whole batch at once, as neither retrying nor splitting changes
+    them. Anything else (timeouts, connection errors, 5xx, 408/429) is retried
+    on the whole batch with exponential backoff.
+    """
+
+    REJECTION_STATUSES = (400, 422)
+    RETRYABLE_STATUSES = (408, 429)
+
+    def __init__(self, client, endpoint, max_records=100, max_delay=5.0, max_retries=3, retry_backoff=1.0):
+        self.client = client
+        self.endpoint = endpoint
+        self.max_records = max_records
+        self.max_delay = max_delay
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.outcomes = []
+        self._pending = []
+        self._oldest = None
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._closed = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def add(self, records):
+        if isinstance(records, dict):
+            records = [records]
+        with self._lock:
+            if not self._pending:
+                self._oldest = time.monotonic()
+            self._pending.extend(records)
+            full = len(self._pending) >= self.max_records
+        if full:
+            self.flush()
+
+    def _run(self):
+        # Time-based flushes, checked a few times per max_delay
+        while not self._closed.wait(self.max_delay / 4):
+            with self._lock:
+                due = self._pending and time.monotonic() - self._oldest >= self.max_delay
+            if due:
+                self.flush()
+
+    @staticmethod
+    def _status_code(error):
+        return getattr(getattr(error, "response", None), "status_code", None)
+
+    def _is_rejection(self, error):
+        """True when the API answered that the payload itself is invalid"""
+        return self._status_code(error) in self.REJECTION_STATUSES
+
+    def _is_permanent(self, error):
+        """True for client errors that the same request will hit again"""
+        status_code = self._status_code(error)
+        return status_code is not None and 400 <= status_code < 500 and status_code not in self.RETRYABLE_STATUSES
+
+    def _send(self, batch):
+        """Post a batch, retrying transient failures; client errors are raised straight away"""
+        for attempt in range(self.max_retries + 1):
+            try:
+                return self.client.post_request(endpoint=self.endpoint, payload=batch)
+            except Exception as e:
+                if self._is_permanent(e) or attempt == self.max_retries:
+                    raise
+                delay = self.retry_backoff * 2 ** attempt
+                print(f"Write to {self.endpoint} failed ({e}), retrying in {delay:.1f}s ({attempt + 1}/{self.max_retries})")
+                time.sleep(delay)
+
+    def _post(self, batch):
+        try:
+            response = self._send(batch)
+            return [{"record": record, "ok": True, "response": response} for record in batch]
+        except Exception as e:
+            if len(batch) == 1 or not self._is_rejection(e):
+                return [{"record": record, "ok": False, "error": str(e)} for record in batch]
+            # Split the batch to isolate the records the API rejected
+            middle = len(batch) // 2
+            return self._post(batch[:middle]) + self._post(batch[middle:])
+
+    def flush(self):
+        """Post everything pending now and return the outcomes of this flush"""
+        with self._flush_lock:
+            with self._lock:
+                batch, self._pending = self._pending, []
+            if not batch:
+                return []
+            outcomes = self._post(batch)
+            self.outcomes.extend(outcomes)
+            failed = sum(not outcome["ok"] for outcome in outcomes)
+            print(f"Flushed {len(batch)} records to {self.endpoint}: {len(batch) - failed} succeeded, {failed} failed")
+            return outcomes
+
+    def close(self):
+        self._closed.set()
+        return self.flush()